@@ -0,0 +1,264 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, List, Tuple
+
+from sqlalchemy import Date, String, cast, delete, func, insert, literal, select, union
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal
+from .models import Category, Order, OrderItem, SalesDailyProduct, SalesDailyTotal
+from .schemas import SalesBreakdownRead
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_ID = 0
+SALES_ROLLUP_SHARDS = 16
+SALES_ROLLUP_LOCK_KEY = 740_215_002
+
+
+async def _lock_rollup_day(session: AsyncSession, day: date, exclusive: bool = False) -> None:
+    # Checkouts share the lock for their order day; a rebuild of that day takes it exclusively.
+    lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+    await session.execute(select(lock(SALES_ROLLUP_LOCK_KEY, day.toordinal())))
+
+
+async def apply_order_to_rollups(
+    session: AsyncSession, order: Order, status: str, sign: int
+) -> None:
+    day = order.created_at.date()
+    # Each order always lands in the same shard, so concurrent checkouts spread their
+    # row locks over several totals rows and reads simply sum the shards.
+    shard = order.id % SALES_ROLLUP_SHARDS
+    await _lock_rollup_day(session, day)
+
+    totals = pg_insert(SalesDailyTotal).values(
+        day=day,
+        status=status,
+        shard=shard,
+        order_count=sign,
+        revenue=sign * Decimal(order.total_price),
+    )
+    await session.execute(
+        totals.on_conflict_do_update(
+            index_elements=[SalesDailyTotal.day, SalesDailyTotal.status, SalesDailyTotal.shard],
+            set_={
+                "order_count": SalesDailyTotal.order_count + totals.excluded.order_count,
+                "revenue": SalesDailyTotal.revenue + totals.excluded.revenue,
+            },
+        )
+    )
+
+    rows: Dict[Tuple[int, int], dict] = {}
+    for item in order.items:
+        key = (
+            item.sales_product_id if item.sales_product_id is not None else UNKNOWN_ID,
+            item.sales_category_id if item.sales_category_id is not None else UNKNOWN_ID,
+        )
+        row = rows.setdefault(
+            key,
+            {
+                "day": day,
+                "status": status,
+                "product_id": key[0],
+                "category_id": key[1],
+                "shard": shard,
+                "product_name": item.product_name,
+                "quantity": 0,
+                "revenue": Decimal("0.00"),
+            },
+        )
+        row["quantity"] += sign * item.quantity
+        row["revenue"] += sign * Decimal(item.total_price)
+
+    if not rows:
+        return
+
+    # Sorted so concurrent checkouts lock rollup rows in the same order.
+    products = pg_insert(SalesDailyProduct).values([rows[key] for key in sorted(rows)])
+    await session.execute(
+        products.on_conflict_do_update(
+            index_elements=[
+                SalesDailyProduct.day,
+                SalesDailyProduct.status,
+                SalesDailyProduct.product_id,
+                SalesDailyProduct.category_id,
+                SalesDailyProduct.shard,
+            ],
+            set_={
+                "product_name": products.excluded.product_name,
+                "quantity": SalesDailyProduct.quantity + products.excluded.quantity,
+                "revenue": SalesDailyProduct.revenue + products.excluded.revenue,
+            },
+        )
+    )
+
+
+async def _rollup_days(session: AsyncSession) -> List[date]:
+    days = union(
+        select(cast(Order.created_at, Date)),
+        select(SalesDailyTotal.day),
+        select(SalesDailyProduct.day),
+    ).subquery()
+    result = await session.execute(select(days.c[0]).order_by(days.c[0]))
+    return [day for day in result.scalars() if day is not None]
+
+
+async def _rebuild_rollup_day(session: AsyncSession, day: date) -> None:
+    await _lock_rollup_day(session, day, exclusive=True)
+    await session.execute(delete(SalesDailyTotal).where(SalesDailyTotal.day == day))
+    await session.execute(delete(SalesDailyProduct).where(SalesDailyProduct.day == day))
+
+    start = datetime.combine(day, time.min)
+    in_day = (Order.created_at >= start, Order.created_at < start + timedelta(days=1))
+    order_status = cast(Order.status, String)
+    order_shard = Order.id % SALES_ROLLUP_SHARDS
+    await session.execute(
+        insert(SalesDailyTotal).from_select(
+            ["day", "status", "shard", "order_count", "revenue"],
+            select(
+                literal(day, Date),
+                order_status,
+                order_shard,
+                func.count(Order.id),
+                func.coalesce(func.sum(Order.total_price), 0),
+            )
+            .where(*in_day)
+            .group_by(order_status, order_shard),
+        )
+    )
+
+    product_key = func.coalesce(OrderItem.sales_product_id, UNKNOWN_ID)
+    category_key = func.coalesce(OrderItem.sales_category_id, UNKNOWN_ID)
+    await session.execute(
+        insert(SalesDailyProduct).from_select(
+            [
+                "day",
+                "status",
+                "product_id",
+                "category_id",
+                "shard",
+                "product_name",
+                "quantity",
+                "revenue",
+            ],
+            select(
+                literal(day, Date),
+                order_status,
+                product_key,
+                category_key,
+                order_shard,
+                func.max(OrderItem.product_name),
+                func.sum(OrderItem.quantity),
+                func.sum(OrderItem.total_price),
+            )
+            .select_from(OrderItem)
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(*in_day)
+            .group_by(order_status, product_key, category_key, order_shard),
+        )
+    )
+
+
+async def rebuild_sales_rollups(session: AsyncSession) -> int:
+    # One short transaction per day: only checkouts for the day being rebuilt wait.
+    days = await _rollup_days(session)
+    await session.commit()
+    for day in days:
+        await _rebuild_rollup_day(session, day)
+        await session.commit()
+    return len(days)
+
+
+async def sales_breakdown(
+    session: AsyncSession,
+    group_by: str,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    status: str | None = None,
+) -> List[SalesBreakdownRead]:
+    if group_by == "day":
+        stmt = (
+            select(
+                SalesDailyTotal.day,
+                func.sum(SalesDailyTotal.order_count),
+                func.sum(SalesDailyTotal.revenue),
+            )
+            .group_by(SalesDailyTotal.day)
+            .order_by(SalesDailyTotal.day)
+        )
+        stmt = _filter_rollup(stmt, SalesDailyTotal, date_from, date_to, status)
+        result = await session.execute(stmt)
+        return [
+            SalesBreakdownRead(day=day, order_count=order_count, revenue=float(revenue))
+            for day, order_count, revenue in result.all()
+        ]
+
+    if group_by == "category":
+        stmt = (
+            select(
+                SalesDailyProduct.category_id,
+                Category.name,
+                func.sum(SalesDailyProduct.quantity),
+                func.sum(SalesDailyProduct.revenue),
+            )
+            .outerjoin(Category, Category.id == SalesDailyProduct.category_id)
+            .group_by(SalesDailyProduct.category_id, Category.name)
+            .order_by(func.sum(SalesDailyProduct.revenue).desc())
+        )
+        stmt = _filter_rollup(stmt, SalesDailyProduct, date_from, date_to, status)
+        result = await session.execute(stmt)
+        return [
+            SalesBreakdownRead(
+                category_id=category_id,
+                category_name=category_name,
+                quantity=quantity,
+                revenue=float(revenue),
+            )
+            for category_id, category_name, quantity, revenue in result.all()
+        ]
+
+    stmt = (
+        select(
+            SalesDailyProduct.product_id,
+            func.max(SalesDailyProduct.product_name),
+            func.sum(SalesDailyProduct.quantity),
+            func.sum(SalesDailyProduct.revenue),
+        )
+        .group_by(SalesDailyProduct.product_id)
+        .order_by(func.sum(SalesDailyProduct.revenue).desc())
+    )
+    stmt = _filter_rollup(stmt, SalesDailyProduct, date_from, date_to, status)
+    result = await session.execute(stmt)
+    return [
+        SalesBreakdownRead(
+            product_id=product_id,
+            product_name=product_name,
+            quantity=quantity,
+            revenue=float(revenue),
+        )
+        for product_id, product_name, quantity, revenue in result.all()
+    ]
+
+
+def _filter_rollup(stmt, model, date_from: date | None, date_to: date | None, status: str | None):
+    if date_from is not None:
+        stmt = stmt.where(model.day >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(model.day <= date_to)
+    if status:
+        stmt = stmt.where(model.status == status)
+    return stmt
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    async with AsyncSessionLocal() as session:
+        days = await rebuild_sales_rollups(session)
+    logger.info("Sales rollups rebuilt from order_items for %s days", days)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
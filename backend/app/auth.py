@@ -0,0 +1,158 @@
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException, status
+
+from .config import get_settings
+
+settings = get_settings()
+
+BEARER_PREFIX = "bearer "
+
+
+@dataclass(frozen=True)
+class SessionClaims:
+    telegram_id: int
+    is_admin: bool
+    expires_at: int
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail)
+
+
+def _hmac_sha256(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _require_bot_token() -> str:
+    if not settings.bot_token:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Telegram auth is not configured",
+        )
+    return settings.bot_token
+
+
+def _session_secret() -> bytes:
+    if settings.session_secret:
+        return settings.session_secret.encode("utf-8")
+    return _hmac_sha256(b"SessionToken", _require_bot_token())
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(_hmac_sha256(_session_secret(), payload))
+
+
+def verify_init_data(init_data: str) -> dict:
+    fields = dict(parse_qsl(init_data, keep_blank_values=True))
+    received_hash = fields.pop("hash", None)
+    if not received_hash:
+        raise _unauthorized("initData hash missing")
+
+    data_check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
+    secret_key = _hmac_sha256(b"WebAppData", _require_bot_token())
+    expected_hash = _hmac_sha256(secret_key, data_check_string).hex()
+    if not hmac.compare_digest(expected_hash, received_hash):
+        raise _unauthorized("Invalid initData signature")
+
+    try:
+        auth_date = int(fields.get("auth_date", "0"))
+        user = json.loads(fields["user"])
+        telegram_id = int(user["id"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise _unauthorized("Malformed initData") from exc
+
+    if time.time() - auth_date > settings.telegram_init_data_max_age_seconds:
+        raise _unauthorized("initData has expired")
+
+    return {**user, "id": telegram_id}
+
+
+def issue_session_token(telegram_id: int, is_admin: bool) -> tuple[str, SessionClaims]:
+    claims = SessionClaims(
+        telegram_id=telegram_id,
+        is_admin=is_admin,
+        expires_at=int(time.time()) + settings.session_token_ttl_seconds,
+    )
+    payload = _b64encode(
+        json.dumps(
+            {"uid": claims.telegram_id, "adm": int(claims.is_admin), "exp": claims.expires_at},
+            separators=(",", ":"),
+        ).encode("utf-8")
+    )
+    return f"{payload}.{_sign(payload)}", claims
+
+
+def _decode_session_token(token: str) -> SessionClaims | None:
+    payload, _, signature = token.partition(".")
+    if not payload or not signature:
+        return None
+    if not hmac.compare_digest(_sign(payload), signature):
+        return None
+    try:
+        data = json.loads(_b64decode(payload))
+        return SessionClaims(
+            telegram_id=int(data["uid"]),
+            is_admin=bool(data["adm"]),
+            expires_at=int(data["exp"]),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class SessionTokenCache:
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._entries: OrderedDict[str, SessionClaims] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verify(self, token: str) -> SessionClaims | None:
+        now = time.time()
+        with self._lock:
+            claims = self._entries.get(token)
+            if claims is not None:
+                if claims.expires_at > now:
+                    self._entries.move_to_end(token)
+                    return claims
+                del self._entries[token]
+                return None
+
+        claims = _decode_session_token(token)
+        if claims is None or claims.expires_at <= now:
+            return None
+        with self._lock:
+            self._entries[token] = claims
+            self._entries.move_to_end(token)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+        return claims
+
+
+session_tokens = SessionTokenCache(settings.session_token_cache_size)
+
+
+def claims_from_authorization(authorization: str | None) -> SessionClaims | None:
+    if not authorization:
+        return None
+    if not authorization.lower().startswith(BEARER_PREFIX):
+        raise _unauthorized("Unsupported authorization scheme")
+    claims = session_tokens.verify(authorization[len(BEARER_PREFIX):].strip())
+    if claims is None:
+        raise _unauthorized("Invalid or expired session token")
+    return claims
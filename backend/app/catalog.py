@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import AsyncSessionLocal, read_your_writes
+from .models import Category, Product
+from .notifications import CACHE_INVALIDATION_CHANNEL, CATALOG_CACHE_KEY, notify
+from .schemas import CategoryRead, ProductRead
+from .utils import make_etag
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    categories: Tuple[CategoryRead, ...]
+    products: Tuple[ProductRead, ...]
+    products_by_category: Dict[int, Tuple[ProductRead, ...]] = field(default_factory=dict)
+    categories_etag: str = ""
+    products_etag: str = ""
+    product_etags_by_category: Dict[int, str] = field(default_factory=dict)
+    catalog_body: bytes = b"[]"
+    catalog_etag: str = ""
+
+    def products_for(self, category_id: int | None) -> Tuple[ProductRead, ...]:
+        if not category_id:
+            return self.products
+        return self.products_by_category.get(category_id, ())
+
+    def products_etag_for(self, category_id: int | None) -> str:
+        if not category_id:
+            return self.products_etag
+        return self.product_etags_by_category.get(category_id) or _EMPTY_ETAG
+
+
+class CatalogCache:
+    def __init__(self) -> None:
+        self._snapshot: CatalogSnapshot | None = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    async def get(self, session: AsyncSession) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            version = self._version
+            if read_your_writes.is_pinned(CATALOG_CACHE_KEY):
+                async with AsyncSessionLocal() as primary:
+                    snapshot = await _load_snapshot(primary, version)
+            else:
+                snapshot = await _load_snapshot(session, version)
+            if version == self._version:
+                self._snapshot = snapshot
+            return snapshot
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._snapshot = None
+        read_your_writes.mark(CATALOG_CACHE_KEY)
+
+    async def notify_changed(self, session: AsyncSession) -> None:
+        # Sent inside the mutating transaction, so other workers hear about the change
+        # exactly when it commits and never miss it.
+        await notify(session, CACHE_INVALIDATION_CHANNEL, CATALOG_CACHE_KEY)
+
+    async def refresh(self, session: AsyncSession) -> None:
+        # Rebuilds this worker's snapshot after the change committed. The cache is already
+        # invalidated, so a failed rebuild only means the next read loads it lazily.
+        async with self._lock:
+            self.invalidate()
+            version = self._version
+            try:
+                snapshot = await _load_snapshot(session, version)
+            except Exception:  # pragma: no cover - next read rebuilds lazily
+                logger.exception("Failed to rebuild catalog snapshot")
+                return
+            if version == self._version:
+                self._snapshot = snapshot
+
+
+async def _load_snapshot(session: AsyncSession, version: int) -> CatalogSnapshot:
+    categories_result = await session.execute(select(Category).order_by(Category.id))
+    products_result = await session.execute(select(Product).order_by(Product.id))
+
+    categories = tuple(CategoryRead.model_validate(item) for item in categories_result.scalars())
+    products = tuple(ProductRead.model_validate(item) for item in products_result.scalars())
+
+    grouped: Dict[int, list[ProductRead]] = {}
+    for product in products:
+        grouped.setdefault(product.category_id, []).append(product)
+
+    products_by_category = {key: tuple(value) for key, value in grouped.items()}
+    catalog_body = orjson.dumps(
+        [
+            {
+                **category.model_dump(),
+                "products": [
+                    product.model_dump() for product in products_by_category.get(category.id, ())
+                ],
+            }
+            for category in categories
+        ]
+    )
+
+    return CatalogSnapshot(
+        version=version,
+        categories=categories,
+        products=products,
+        products_by_category=products_by_category,
+        categories_etag=_content_etag(categories),
+        products_etag=_content_etag(products),
+        product_etags_by_category={
+            key: _content_etag(value) for key, value in products_by_category.items()
+        },
+        catalog_body=catalog_body,
+        catalog_etag=make_etag(hashlib.sha256(catalog_body).hexdigest()),
+    )
+
+
+def _content_etag(items: Tuple[CategoryRead, ...] | Tuple[ProductRead, ...]) -> str:
+    digest = hashlib.sha256()
+    for item in items:
+        digest.update(item.model_dump_json().encode("utf-8"))
+        digest.update(b"\n")
+    return make_etag(digest.hexdigest())
+
+
+_EMPTY_ETAG = _content_etag(())
+
+
+catalog_cache = CatalogCache()
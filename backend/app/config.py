@@ -1,5 +1,5 @@
 from functools import lru_cache
-from typing import List
+from typing import List, Literal
 import re
 
 from pydantic import Field, field_validator
@@ -47,17 +47,55 @@ class Settings(BaseSettings):
     admin_phone_numbers: List[str] | str | None = Field(default_factory=list)
 
     database_url: str = "postgresql+psycopg2://postgres:postgres@db:5432/telegram_mini_app"
+    database_direct_url: str | None = None
+    database_read_url: str | None = None
+    read_replica_pin_seconds: float = Field(default=5.0, ge=0)
+    db_pgbouncer: bool = False
     db_startup_retries: int = Field(default=10, ge=1)
     db_startup_retry_delay: float = Field(default=2.0, gt=0)
+    db_max_connections: int = Field(default=90, ge=2)
+    db_pool_size: int | None = Field(default=None, ge=1)
+    db_max_overflow: int | None = Field(default=None, ge=0)
+    db_pool_timeout: float = Field(default=30.0, gt=0)
+    db_pool_recycle: int = -1
+    db_pool_pre_ping: bool = False
+    db_statement_cache_size: int = Field(default=100, ge=0)
+
+    server_host: str = "0.0.0.0"
+    server_port: int = Field(default=8000, gt=0)
+    web_concurrency: int = Field(default=1, ge=1)
 
     media_root: str = "app/static/uploads"
     media_url: str = "/static/uploads"
     media_base_url: str | None = None
+    media_accel_redirect_prefix: str | None = None
     max_upload_size_mb: float = Field(default=10.0, gt=0)
+    image_variant_workers: int = Field(default=1, ge=1)
+    media_gc_grace_hours: float = Field(default=24.0, ge=0)
+    media_storage: Literal["filesystem", "s3"] = "filesystem"
+
+    s3_bucket: str | None = None
+    s3_endpoint_url: str | None = None
+    s3_presign_endpoint_url: str | None = None
+    s3_region: str = "us-east-1"
+    s3_access_key_id: str | None = None
+    s3_secret_access_key: str | None = None
+    s3_public_base_url: str | None = None
+    s3_presign_expires_seconds: int = Field(default=900, gt=0)
+    s3_multipart_chunk_mb: int = Field(default=8, ge=5)
+
+    idempotency_key_ttl_hours: float = Field(default=24.0, gt=0)
+    idempotency_sweep_interval_seconds: float = Field(default=3600.0, gt=0)
 
     bot_token: str | None = None
     webapp_url: str | None = None
 
+    session_secret: str | None = None
+    session_token_ttl_seconds: int = Field(default=3600, gt=0)
+    session_token_cache_size: int = Field(default=4096, ge=1)
+    telegram_init_data_max_age_seconds: int = Field(default=86400, gt=0)
+    admin_header_auth_enabled: bool = True
+
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8", extra="ignore")
 
     @field_validator("backend_cors_origins", mode="before")
@@ -122,6 +160,20 @@ class Settings(BaseSettings):
                 normalized.append(phone)
         return normalized
 
+    @field_validator("database_direct_url", "database_read_url", mode="before")
+    @classmethod
+    def parse_optional_database_url(cls, value: str | None) -> str | None:
+        if value in (None, ""):
+            return None
+        return str(value).strip() or None
+
+    @field_validator("db_pool_size", "db_max_overflow", mode="before")
+    @classmethod
+    def parse_optional_pool_limit(cls, value: int | str | None) -> int | None:
+        if value in (None, ""):
+            return None
+        return int(value)
+
     @field_validator("media_url", mode="before")
     @classmethod
     def normalize_media_url(cls, value: str | None) -> str:
@@ -136,6 +188,14 @@ class Settings(BaseSettings):
             normalized = normalized.rstrip("/")
         return normalized
 
+    @field_validator("media_accel_redirect_prefix", mode="before")
+    @classmethod
+    def normalize_media_accel_redirect_prefix(cls, value: str | None) -> str | None:
+        normalized = _normalize_prefix(value)
+        if normalized in ("", "/"):
+            return None
+        return normalized
+
     @field_validator("media_base_url", mode="before")
     @classmethod
     def normalize_media_base_url(cls, value: str | None) -> str | None:
@@ -146,6 +206,29 @@ class Settings(BaseSettings):
             return None
         return normalized.rstrip("/")
 
+    @field_validator("media_storage", mode="before")
+    @classmethod
+    def normalize_media_storage(cls, value: str | None) -> str:
+        if value in (None, ""):
+            return "filesystem"
+        return str(value).strip().lower()
+
+    @field_validator("s3_bucket", "s3_access_key_id", "s3_secret_access_key", mode="before")
+    @classmethod
+    def parse_optional_s3_setting(cls, value: str | None) -> str | None:
+        if value in (None, ""):
+            return None
+        return str(value).strip() or None
+
+    @field_validator(
+        "s3_endpoint_url", "s3_presign_endpoint_url", "s3_public_base_url", mode="before"
+    )
+    @classmethod
+    def normalize_s3_url(cls, value: str | None) -> str | None:
+        if value in (None, ""):
+            return None
+        return str(value).strip().rstrip("/") or None
+
     @field_validator("max_upload_size_mb", mode="before")
     @classmethod
     def parse_max_upload_size(cls, value: float | str | None) -> float:
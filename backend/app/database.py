@@ -1,5 +1,17 @@
+import logging
+import time
+from pathlib import Path
+from typing import Dict
+from uuid import uuid4
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from fastapi import Request
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import (
-    AsyncConnection,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
@@ -7,6 +19,13 @@ from sqlalchemy.ext.asyncio import (
 from sqlalchemy.orm import DeclarativeBase
 
 from .config import get_settings
+from .db_metrics import InstrumentedAsyncPool, InstrumentedNullPool, instrument_engine
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PATH = Path(__file__).resolve().parent / "migrations"
+STARTUP_LOCK_KEY = 740_215_001
 
 
 class Base(DeclarativeBase):
@@ -14,66 +33,107 @@ class Base(DeclarativeBase):
 
 
 settings = get_settings()
-engine = create_async_engine(settings.database_url.replace("postgresql+psycopg2", "postgresql+asyncpg"))
-AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+async_database_url = settings.database_url.replace("postgresql+psycopg2", "postgresql+asyncpg")
+async_read_database_url = (
+    settings.database_read_url.replace("postgresql+psycopg2", "postgresql+asyncpg")
+    if settings.database_read_url
+    else None
+)
 
 
-async def _apply_schema_patches(conn: AsyncConnection) -> None:
-    statements = (
-        "ALTER TABLE categories ADD COLUMN IF NOT EXISTS image_path VARCHAR(512)",
-        "ALTER TABLE products ADD COLUMN IF NOT EXISTS image_path VARCHAR(512)",
-        "ALTER TABLE products ADD COLUMN IF NOT EXISTS detail TEXT",
-        "ALTER TABLE users ALTER COLUMN telegram_id TYPE BIGINT USING telegram_id::bigint",
-        "ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_product_id_fkey",
-        "ALTER TABLE order_items ALTER COLUMN product_id DROP NOT NULL",
-        "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS product_name VARCHAR(255)",
-        "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS product_image_path VARCHAR(512)",
-        "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS product_detail TEXT",
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS phone_number_normalized VARCHAR(32)",
-        "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_admin BOOLEAN DEFAULT FALSE",
-    )
+def _pool_limits() -> tuple[int, int]:
+    # Every worker keeps one extra connection open for the LISTEN loop.
+    per_worker = max(1, settings.db_max_connections // settings.web_concurrency - 1)
+    pool_size = settings.db_pool_size or min(5, per_worker)
+    max_overflow = settings.db_max_overflow
+    if max_overflow is None:
+        max_overflow = max(0, per_worker - pool_size)
+    return pool_size, max_overflow
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def _engine_options(url: str) -> dict:
+    if settings.db_pgbouncer:
+        # PgBouncer in transaction mode may hand every transaction a different server
+        # connection, so pooling is left to it and prepared statements are never reused.
+        return {
+            "poolclass": InstrumentedNullPool,
+            "pool_pre_ping": settings.db_pool_pre_ping,
+            "connect_args": {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name,
+            },
+        }
+
+    pool_size, max_overflow = _pool_limits()
+    options = {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    return options
+
+
+engine = create_async_engine(async_database_url, **_engine_options(async_database_url))
+instrument_engine(engine)
+AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
-    for statement in statements:
-        await conn.exec_driver_sql(statement)
-
-    await conn.exec_driver_sql(
-        """
-        UPDATE order_items
-        SET
-            product_name = COALESCE(order_items.product_name, products.name),
-            product_detail = COALESCE(order_items.product_detail, products.detail),
-            product_image_path = COALESCE(order_items.product_image_path, products.image_path)
-        FROM products
-        WHERE order_items.product_id = products.id
-        """
+if async_read_database_url:
+    read_engine = create_async_engine(
+        async_read_database_url, **_engine_options(async_read_database_url)
     )
-
-    await conn.exec_driver_sql(
-        "UPDATE order_items SET product_name = COALESCE(product_name, '')"
+    instrument_engine(read_engine)
+    ReadSessionLocal = async_sessionmaker(
+        bind=read_engine, class_=AsyncSession, expire_on_commit=False
     )
+else:
+    read_engine = engine
+    ReadSessionLocal = AsyncSessionLocal
 
-    await conn.exec_driver_sql(
-        "ALTER TABLE order_items ALTER COLUMN product_name SET NOT NULL"
-    )
 
-    await conn.exec_driver_sql(
-        "UPDATE users SET phone_number_normalized = regexp_replace(phone_number, '\\D', '', 'g') "
-        "WHERE phone_number IS NOT NULL"
-    )
+class ReadYourWrites:
+    def __init__(self, max_entries: int = 10000) -> None:
+        self._pinned_until: Dict[str, float] = {}
+        self._max_entries = max_entries
 
-    await conn.exec_driver_sql(
-        "UPDATE users SET is_admin = COALESCE(is_admin, FALSE)"
-    )
+    def mark(self, key: str) -> None:
+        if read_engine is engine:
+            return
+        now = time.monotonic()
+        if len(self._pinned_until) >= self._max_entries:
+            self._pinned_until = {
+                pinned: until for pinned, until in self._pinned_until.items() if until > now
+            }
+        self._pinned_until[key] = now + settings.read_replica_pin_seconds
+
+    def is_pinned(self, key: str) -> bool:
+        until = self._pinned_until.get(key)
+        return until is not None and until > time.monotonic()
+
+
+read_your_writes = ReadYourWrites()
+
+
+def user_pin_key(user_id: int | str) -> str:
+    return f"user:{user_id}"
 
-    await conn.exec_driver_sql(
-        "ALTER TABLE users ALTER COLUMN is_admin SET DEFAULT FALSE"
-    )
-    await conn.exec_driver_sql(
-        "ALTER TABLE users ALTER COLUMN is_admin SET NOT NULL"
-    )
-    await conn.exec_driver_sql(
-        "ALTER TABLE users ALTER COLUMN phone_number_normalized SET NOT NULL"
-    )
+
+def asyncpg_dsn() -> str:
+    # LISTEN needs a session-level connection, which PgBouncer transaction pooling
+    # cannot provide, so the listener may bypass it through DATABASE_DIRECT_URL.
+    url = settings.database_direct_url or async_database_url
+    for driver in ("postgresql+asyncpg", "postgresql+psycopg2"):
+        url = url.replace(driver, "postgresql", 1)
+    return url
 
 
 async def get_session():
@@ -81,15 +141,34 @@ async def get_session():
         yield session
 
 
-async def run_schema_patches(conn: AsyncConnection | None = None) -> None:
-    if conn is not None:
-        await _apply_schema_patches(conn)
+async def get_read_session(request: Request):
+    # Users who just wrote read from the primary until the replica has caught up.
+    user_id = request.path_params.get("user_id") or request.query_params.get("user_id")
+    session_factory = ReadSessionLocal
+    if user_id and read_your_writes.is_pinned(user_pin_key(user_id)):
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
+        yield session
+
+
+def _alembic_config(connection: Connection | None = None) -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    config.attributes["connection"] = connection
+    return config
+
+
+def _upgrade_schema(connection: Connection) -> None:
+    config = _alembic_config(connection)
+    head = ScriptDirectory.from_config(config).get_current_head()
+    current = MigrationContext.configure(connection).get_current_revision()
+    if current == head:
         return
-    async with engine.begin() as new_conn:
-        await _apply_schema_patches(new_conn)
+    logger.info("Upgrading database schema from %s to %s", current, head)
+    command.upgrade(config, "head")
 
 
-async def prepare_database() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        await _apply_schema_patches(conn)
+async def prepare_database(session: AsyncSession) -> None:
+    await session.execute(select(func.pg_advisory_xact_lock(STARTUP_LOCK_KEY)))
+    conn = await session.connection()
+    await conn.run_sync(_upgrade_schema)
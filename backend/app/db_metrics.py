@@ -0,0 +1,152 @@
+import time
+from contextvars import ContextVar, Token
+from dataclasses import dataclass
+from typing import Dict, List
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+@dataclass
+class RouteQueryStats:
+    requests: int = 0
+    queries: int = 0
+    max_queries: int = 0
+    total_seconds: float = 0.0
+
+
+@dataclass
+class CheckoutStats:
+    checkouts: int = 0
+    checkout_timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+
+class DatabaseMetrics:
+    def __init__(self) -> None:
+        # Checkout timings are kept per pool, so the primary and the read replica are
+        # reported separately.
+        self.pools: WeakKeyDictionary[Pool, CheckoutStats] = WeakKeyDictionary()
+        self.routes: Dict[str, RouteQueryStats] = {}
+
+    def record_checkout(self, pool: Pool, waited: float, timed_out: bool = False) -> None:
+        stats = self.pools.get(pool)
+        if stats is None:
+            stats = self.pools[pool] = CheckoutStats()
+        stats.checkouts += 1
+        if timed_out:
+            stats.checkout_timeouts += 1
+        stats.wait_seconds_total += waited
+        stats.wait_seconds_max = max(stats.wait_seconds_max, waited)
+
+    def start_request(self) -> tuple[Token, List[int]]:
+        counter = [0]
+        return _request_queries.set(counter), counter
+
+    def finish_request(self, token: Token, route: str, counter: List[int], elapsed: float) -> None:
+        _request_queries.reset(token)
+        stats = self.routes.setdefault(route, RouteQueryStats())
+        stats.requests += 1
+        stats.queries += counter[0]
+        stats.max_queries = max(stats.max_queries, counter[0])
+        stats.total_seconds += elapsed
+
+    def pool_snapshot(self, pool: Pool) -> dict:
+        stats = self.pools.get(pool) or CheckoutStats()
+        return {
+            "pool_class": type(pool).__name__,
+            "size": _pool_value(pool, "size"),
+            "checked_out": _pool_value(pool, "checkedout"),
+            "idle": _pool_value(pool, "checkedin"),
+            "overflow": max(0, _pool_value(pool, "overflow")),
+            "max_overflow": getattr(pool, "_max_overflow", 0),
+            "checkouts": stats.checkouts,
+            "checkout_timeouts": stats.checkout_timeouts,
+            "wait_seconds_avg": (
+                stats.wait_seconds_total / stats.checkouts if stats.checkouts else 0.0
+            ),
+            "wait_seconds_max": stats.wait_seconds_max,
+        }
+
+    def snapshot(self, pool: Pool, read_pool: Pool | None = None) -> dict:
+        return {
+            "pool": self.pool_snapshot(pool),
+            "read_pool": self.pool_snapshot(read_pool) if read_pool is not None else None,
+            "routes": [
+                {
+                    "route": route,
+                    "requests": stats.requests,
+                    "queries": stats.queries,
+                    "queries_per_request": stats.queries / stats.requests,
+                    "max_queries": stats.max_queries,
+                    "avg_seconds": stats.total_seconds / stats.requests,
+                }
+                for route, stats in sorted(
+                    self.routes.items(), key=lambda item: item[1].queries, reverse=True
+                )
+            ],
+        }
+
+
+class _TimedCheckout:
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            db_metrics.record_checkout(self, time.perf_counter() - started, timed_out=True)
+            raise
+        db_metrics.record_checkout(self, time.perf_counter() - started)
+        return connection
+
+
+class InstrumentedAsyncPool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+class QueryMetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token, counter = db_metrics.start_request()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            db_metrics.finish_request(
+                token, f"{scope['method']} {route}", counter, time.perf_counter() - started
+            )
+
+
+def _pool_value(pool: Pool, name: str) -> int:
+    method = getattr(pool, name, None)
+    return method() if callable(method) else 0
+
+
+def _count_query(*_args) -> None:
+    counter = _request_queries.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_query)
+
+
+_request_queries: ContextVar[List[int] | None] = ContextVar("request_queries", default=None)
+
+db_metrics = DatabaseMetrics()
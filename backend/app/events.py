@@ -0,0 +1,93 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Order
+from .notifications import notify
+
+logger = logging.getLogger(__name__)
+
+ORDER_EVENTS_CHANNEL = "order_events"
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_INTERVAL = 15.0
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def build_order_event(event_type: str, order: Order) -> dict:
+    return {
+        "type": event_type,
+        "order_id": order.id,
+        "user_id": order.user_id,
+        "status": order.status,
+        "total_price": float(order.total_price),
+        "updated_at": order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+async def publish_order_event(session: AsyncSession, event: dict) -> None:
+    await notify(session, ORDER_EVENTS_CHANNEL, json.dumps(event))
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int | None
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(SUBSCRIBER_QUEUE_SIZE))
+
+
+class OrderEventBroker:
+    def __init__(self) -> None:
+        self._subscriptions: set[Subscription] = set()
+
+    def subscribe(self, user_id: int | None = None) -> Subscription:
+        subscription = Subscription(user_id=user_id)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def dispatch(self, event: dict) -> None:
+        for subscription in tuple(self._subscriptions):
+            if subscription.user_id is not None and subscription.user_id != event.get("user_id"):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning("Dropping order event for a slow subscriber")
+
+    def handle_notification(self, payload: str | None) -> None:
+        if payload is None:
+            return
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed order event payload: %s", payload)
+            return
+        self.dispatch(event)
+
+
+order_events = OrderEventBroker()
+
+
+async def stream_order_events(request: Request, user_id: int | None = None) -> AsyncIterator[str]:
+    # Subscribing inside the generator ties the subscription to the body actually being
+    # streamed; a client that disconnects before the first chunk never registers one.
+    subscription = order_events.subscribe(user_id=user_id)
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        order_events.unsubscribe(subscription)
@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row, select, tuple_
+
+from .database import AsyncSessionLocal
+from .models import Order, OrderItem, User
+
+EXPORT_CHUNK_SIZE = 500
+EXPORT_COLUMNS = (
+    "order_id",
+    "order_created_at",
+    "order_updated_at",
+    "order_status",
+    "order_total_price",
+    "order_comment",
+    "user_id",
+    "user_telegram_id",
+    "user_name",
+    "user_phone_number",
+    "item_id",
+    "product_id",
+    "product_name",
+    "quantity",
+    "unit_price",
+    "item_total_price",
+)
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _order_keys_statement(
+    status: str | None, created_from: datetime | None, created_to: datetime | None
+):
+    # Keyset over (created_at, id) alone, so every chunk is a range scan on
+    # ix_orders_created_at_id (or the status variant) instead of a re-sort of the joined rows.
+    stmt = select(Order.created_at, Order.id).order_by(Order.created_at, Order.id).limit(
+        EXPORT_CHUNK_SIZE
+    )
+    if status:
+        stmt = stmt.where(Order.status == status)
+    if created_from is not None:
+        stmt = stmt.where(Order.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Order.created_at < created_to)
+    return stmt
+
+
+def _export_rows_statement(order_ids: Sequence[int]):
+    return (
+        select(
+            Order.id,
+            Order.created_at,
+            Order.updated_at,
+            Order.status,
+            Order.total_price,
+            Order.comment,
+            User.id,
+            User.telegram_id,
+            User.name,
+            User.phone_number,
+            OrderItem.id,
+            OrderItem.product_id,
+            OrderItem.product_name,
+            OrderItem.quantity,
+            OrderItem.unit_price,
+            OrderItem.total_price,
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(User, User.id == Order.user_id)
+        .where(OrderItem.order_id.in_(order_ids))
+        .order_by(Order.created_at, Order.id, OrderItem.id)
+    )
+
+
+def _json_value(value: object) -> object:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _encode_rows(rows: Sequence[Row], export_format: str, include_header: bool) -> str:
+    buffer = io.StringIO()
+    if export_format == "csv":
+        writer = csv.writer(buffer)
+        if include_header:
+            writer.writerow(EXPORT_COLUMNS)
+        for row in rows:
+            writer.writerow(
+                value.isoformat() if isinstance(value, datetime) else value for value in row
+            )
+    else:
+        for row in rows:
+            record = {column: _json_value(value) for column, value in zip(EXPORT_COLUMNS, row)}
+            buffer.write(json.dumps(record, ensure_ascii=False))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+async def iter_order_export(
+    export_format: str,
+    status: str | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> AsyncIterator[str]:
+    # Each chunk is read in its own short transaction and the connection is returned to the
+    # pool before the chunk is sent, so a slow download never pins a pooled connection.
+    base_stmt = _order_keys_statement(status, created_from, created_to)
+    position: tuple[datetime, int] | None = None
+    include_header = True
+
+    while True:
+        stmt = base_stmt
+        if position is not None:
+            stmt = stmt.where(tuple_(Order.created_at, Order.id) > tuple_(*position))
+        async with AsyncSessionLocal() as session:
+            keys = (await session.execute(stmt)).all()
+            rows = []
+            if keys:
+                result = await session.execute(_export_rows_statement([key[1] for key in keys]))
+                rows = result.all()
+
+        if rows or include_header:
+            yield _encode_rows(rows, export_format, include_header)
+        include_header = False
+
+        if len(keys) < EXPORT_CHUNK_SIZE:
+            return
+        position = (keys[-1][0], keys[-1][1])
@@ -0,0 +1,91 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import get_settings
+from .database import AsyncSessionLocal
+from .models import OrderIdempotencyKey
+from .schemas import OrderCreate, OrderRead
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MAX_KEY_LENGTH = 255
+
+
+def hash_order_request(payload: OrderCreate) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode("utf-8")).hexdigest()
+
+
+async def claim_idempotency_key(
+    session: AsyncSession, key: str, request_hash: str
+) -> OrderRead | None:
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters long",
+        )
+
+    claimed = await session.execute(
+        insert(OrderIdempotencyKey)
+        .values(key=key, request_hash=request_hash, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[OrderIdempotencyKey.key])
+        .returning(OrderIdempotencyKey.id)
+    )
+    if claimed.scalar_one_or_none() is not None:
+        return None
+
+    result = await session.execute(
+        select(OrderIdempotencyKey.request_hash, OrderIdempotencyKey.response).where(
+            OrderIdempotencyKey.key == key
+        )
+    )
+    stored = result.one_or_none()
+    if stored is None or stored.response is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+        )
+    if stored.request_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request",
+        )
+    return OrderRead.model_validate(stored.response)
+
+
+async def store_idempotent_response(
+    session: AsyncSession, key: str, order_id: int, response: OrderRead
+) -> None:
+    await session.execute(
+        update(OrderIdempotencyKey)
+        .where(OrderIdempotencyKey.key == key)
+        .values(order_id=order_id, response=response.model_dump(mode="json"))
+    )
+
+
+async def sweep_expired_idempotency_keys(session: AsyncSession) -> int:
+    cutoff = datetime.utcnow() - timedelta(hours=settings.idempotency_key_ttl_hours)
+    result = await session.execute(
+        delete(OrderIdempotencyKey).where(OrderIdempotencyKey.created_at < cutoff)
+    )
+    await session.commit()
+    return result.rowcount or 0
+
+
+async def run_idempotency_sweeper() -> None:
+    while True:
+        await asyncio.sleep(settings.idempotency_sweep_interval_seconds)
+        try:
+            async with AsyncSessionLocal() as session:
+                removed = await sweep_expired_idempotency_keys(session)
+            if removed:
+                logger.info("Removed %s expired idempotency keys", removed)
+        except Exception:  # pragma: no cover - keep sweeping on transient errors
+            logger.exception("Failed to sweep expired idempotency keys")
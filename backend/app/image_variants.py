@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Set, Type
+
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+
+from .catalog import catalog_cache
+from .config import get_settings
+from .database import AsyncSessionLocal
+from .models import Category, Product
+from .storage import media_storage
+
+try:  # pragma: no cover - Pillow optional at runtime
+    from .image_worker import render_image_variants
+except ImportError:  # pragma: no cover - variants are skipped without Pillow
+    render_image_variants = None
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+ImageModel = Type[Category] | Type[Product]
+
+
+def variant_urls(url: str, filenames: Dict[str, str]) -> Dict[str, str]:
+    base = url.rsplit("/", 1)[0]
+    return {name: f"{base}/{filename}" for name, filename in filenames.items()}
+
+
+class ImageVariantPipeline:
+    def __init__(self) -> None:
+        self._executor: ProcessPoolExecutor | None = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.image_variant_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def schedule(self, model: ImageModel, object_id: int, url: str | None) -> None:
+        if render_image_variants is None or not url:
+            return
+        task = asyncio.create_task(self.generate(model, object_id, url))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def generate(self, model: ImageModel, object_id: int, url: str) -> bool:
+        key = media_storage.key_for_url(url)
+        if key is None:
+            return False
+        loop = asyncio.get_running_loop()
+        filenames: Dict[str, str] = {}
+        try:
+            # Remote backends hand back a temporary copy and publish the variants afterwards.
+            source = await run_in_threadpool(media_storage.fetch_local, key)
+            try:
+                filenames = await loop.run_in_executor(
+                    self._get_executor(), render_image_variants, str(source)
+                )
+            finally:
+                await run_in_threadpool(
+                    media_storage.finish_local, key, source, filenames.values()
+                )
+        except Exception:
+            logger.exception("Failed to render image variants for %s", url)
+            return False
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                update(model)
+                .where(model.id == object_id, model.image_path == url)
+                .values(image_variants=variant_urls(url, filenames))
+            )
+            if not result.rowcount:
+                return False
+            await catalog_cache.notify_changed(session)
+            await session.commit()
+            await catalog_cache.refresh(session)
+        return True
+
+    async def shutdown(self) -> None:
+        for task in tuple(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_variants = ImageVariantPipeline()
+
+
+async def backfill_image_variants() -> int:
+    generated = 0
+    for model in (Category, Product):
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(model.id, model.image_path).where(
+                    model.image_path.is_not(None), model.image_variants.is_(None)
+                )
+            )
+            rows = result.all()
+        for object_id, url in rows:
+            if await image_variants.generate(model, object_id, url):
+                generated += 1
+    return generated
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    if render_image_variants is None:
+        raise SystemExit("Pillow is required to render image variants")
+    try:
+        generated = await backfill_image_variants()
+    finally:
+        await image_variants.shutdown()
+    logger.info("Rendered image variants for %s images", generated)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,31 @@
+import os
+from pathlib import Path
+from typing import Dict
+
+from PIL import Image, ImageOps
+
+IMAGE_VARIANT_WIDTHS = {"thumb": 160, "card": 480, "detail": 1080}
+WEBP_QUALITY = 80
+
+
+def render_image_variants(source: str) -> Dict[str, str]:
+    # Runs in a worker process; keep imports here limited to Pillow.
+    source_path = Path(source)
+    filenames = {name: f"{source_path.stem}_{name}.webp" for name in IMAGE_VARIANT_WIDTHS}
+    if all(source_path.with_name(filename).exists() for filename in filenames.values()):
+        # Content-addressed originals share variants with earlier identical uploads.
+        return filenames
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        for name, width in IMAGE_VARIANT_WIDTHS.items():
+            variant = image
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                variant = image.resize((width, height), Image.Resampling.LANCZOS)
+            target = source_path.with_name(filenames[name])
+            temp_target = target.with_name(f".{target.name}.part")
+            variant.save(temp_target, "WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(temp_target, target)
+    return filenames
@@ -1,14 +1,28 @@
 import asyncio
+import json
 import logging
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from sqlalchemy.exc import OperationalError
 
 from .config import get_settings
-from .database import prepare_database
-from .routers import categories, orders, products, users
+from .database import AsyncSessionLocal, prepare_database, read_your_writes, user_pin_key
+from .catalog import catalog_cache
+from .db_metrics import QueryMetricsMiddleware
+from .events import ORDER_EVENTS_CHANNEL, order_events
+from .idempotency import run_idempotency_sweeper
+from .image_variants import image_variants
+from .media import MediaFiles
+from .notifications import (
+    ADMIN_CACHE_KEY,
+    CACHE_INVALIDATION_CHANNEL,
+    CATALOG_CACHE_KEY,
+    pg_listener,
+)
+from .routing import PrefixAliasMiddleware, build_prefix_aliases
+from .utils import UploadSizeLimitMiddleware, admin_directory, sync_admin_settings
+from .routers import analytics, auth, catalog, categories, media, metrics, orders, products, users
 
 try:  # pragma: no cover - asyncpg optional at runtime
     from asyncpg import PostgresError
@@ -20,15 +34,48 @@ settings = get_settings()
 app = FastAPI(title=settings.app_name)
 logger = logging.getLogger(__name__)
 
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.backend_cors_origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
+)
+
+app.add_middleware(QueryMetricsMiddleware)
+app.add_middleware(
+    PrefixAliasMiddleware,
+    aliases=build_prefix_aliases(
+        settings.api_prefix, settings.additional_api_prefixes, settings.public_api_roots
+    ),
 )
 
 
+def _invalidate_caches(payload: str | None) -> None:
+    if payload in (None, CATALOG_CACHE_KEY):
+        catalog_cache.invalidate()
+    if payload in (None, ADMIN_CACHE_KEY):
+        admin_directory.invalidate()
+
+
+def _pin_order_owner(payload: str | None) -> None:
+    if payload is None:
+        return
+    try:
+        user_id = json.loads(payload).get("user_id")
+    except ValueError:
+        return
+    if user_id is not None:
+        read_your_writes.mark(user_pin_key(user_id))
+
+
+pg_listener.add_handler(ORDER_EVENTS_CHANNEL, order_events.handle_notification)
+pg_listener.add_handler(ORDER_EVENTS_CHANNEL, _pin_order_owner)
+pg_listener.add_handler(CACHE_INVALIDATION_CHANNEL, _invalidate_caches)
+
+
 @app.on_event("startup")
 async def on_startup():
     retryable: tuple[type[Exception], ...] = (OperationalError, OSError)
@@ -38,7 +85,10 @@ async def on_startup():
     attempts = 0
     while True:
         try:
-            await prepare_database()
+            async with AsyncSessionLocal() as session:
+                await prepare_database(session)
+                await sync_admin_settings(session)
+                await session.commit()
             break
         except retryable as exc:  # type: ignore[arg-type]
             attempts += 1
@@ -57,53 +107,41 @@ async def on_startup():
             )
             await asyncio.sleep(wait_time)
 
+    app.state.idempotency_sweeper = asyncio.create_task(run_idempotency_sweeper())
+    pg_listener.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    sweeper = getattr(app.state, "idempotency_sweeper", None)
+    if sweeper is not None:
+        sweeper.cancel()
+    await pg_listener.stop()
+    await image_variants.shutdown()
+
 
 async def health_check():
     return {"status": "ok"}
 
 
-def _register_prefix(prefix: str) -> None:
-    normalized_prefix = prefix or ""
-    if normalized_prefix in seen_prefixes:
-        return
-    seen_prefixes.add(normalized_prefix)
-    app.include_router(users.router, prefix=normalized_prefix)
-    app.include_router(categories.router, prefix=normalized_prefix)
-    app.include_router(products.router, prefix=normalized_prefix)
-    app.include_router(orders.router, prefix=normalized_prefix)
-
-
-prefixes = [settings.api_prefix, *settings.additional_api_prefixes]
-public_roots = getattr(settings, "public_api_roots", [])
-
-seen_prefixes: set[str] = set()
-
-for prefix in prefixes:
-    _register_prefix(prefix)
-
-for public_root in public_roots:
-    for prefix in prefixes:
-        if not public_root:
-            combined = prefix
-        elif not prefix or prefix == "/":
-            combined = public_root
-        elif public_root == "/":
-            combined = prefix
-        else:
-            combined = f"{public_root}{prefix}"
-        _register_prefix(combined)
-
-health_paths = ["/health"]
-health_paths.extend(
-    f"{public_root}/health" for public_root in public_roots if public_root and public_root != "/"
+API_ROUTERS = (
+    auth.router,
+    users.router,
+    categories.router,
+    catalog.router,
+    media.router,
+    metrics.router,
+    products.router,
+    orders.router,
+    analytics.router,
 )
 
-seen_health_paths: set[str] = set()
+# Routers are mounted once; PrefixAliasMiddleware rewrites the other public prefixes onto
+# this one, so the route table and per-request matching cost do not grow with aliases.
+api_prefix = "" if settings.api_prefix == "/" else settings.api_prefix
+for api_router in API_ROUTERS:
+    app.include_router(api_router, prefix=api_prefix)
 
-for path in health_paths:
-    if path in seen_health_paths:
-        continue
-    seen_health_paths.add(path)
-    app.add_api_route(path, health_check, methods=["GET"])
+app.add_api_route("/health", health_check, methods=["GET"])
 
-app.mount(settings.media_url, StaticFiles(directory=settings.media_root), name="uploads")
+app.mount(settings.media_url, MediaFiles(directory=settings.media_root), name="uploads")
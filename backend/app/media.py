@@ -0,0 +1,190 @@
+import gzip
+import os
+import re
+from email.utils import formatdate
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Dict, FrozenSet
+from urllib.parse import quote
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, PathLike, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from .config import get_settings
+
+try:  # pragma: no cover - brotli optional at runtime
+    import brotli
+except ImportError:  # pragma: no cover - only gzip variants without brotli
+    brotli = None
+
+settings = get_settings()
+
+MEDIA_CACHE_CONTROL = "public, max-age=31536000, immutable"
+COMPRESSIBLE_EXTENSIONS: FrozenSet[str] = frozenset(
+    {".svg", ".json", ".txt", ".xml", ".css", ".js", ".html"}
+)
+PRECOMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+_CONTENT_ADDRESSED_STEM = re.compile(r"[0-9a-f]{64}(_[a-z]+)?")
+
+
+def write_precompressed(path: Path) -> None:
+    if path.suffix not in COMPRESSIBLE_EXTENSIONS:
+        return
+    data = path.read_bytes()
+    _write_atomic(path.with_name(f"{path.name}.gz"), gzip.compress(data, compresslevel=9))
+    if brotli is not None:
+        _write_atomic(path.with_name(f"{path.name}.br"), brotli.compress(data))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    temp_path = path.with_name(f".{path.name}.part")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, path)
+
+
+def _media_etag(path: Path, stat_result: os.stat_result) -> str:
+    stem = path.name.split(".", 1)[0]
+    if _CONTENT_ADDRESSED_STEM.fullmatch(stem):
+        return f'"{stem}"'
+    # Older uploads have random names; mtime and size still identify their bytes.
+    return f'"{int(stat_result.st_mtime)}-{stat_result.st_size:x}"'
+
+
+def _parse_byte_range(value: str, size: int) -> tuple[int, int] | None:
+    # Only a single, well-formed range is honoured; anything else, including a last byte
+    # before the first, falls back to the full file. What is left can still be unsatisfiable.
+    unit, _, spec = value.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, dash, end_text = spec.strip().partition("-")
+    if not dash or (end_text and not end_text.isdigit()):
+        return None
+    if start_text.isdigit():
+        start = int(start_text)
+        if not end_text:
+            end = size - 1
+        elif int(end_text) < start:
+            return None
+        else:
+            end = int(end_text)
+    elif not start_text and end_text:
+        suffix_length = int(end_text)
+        if suffix_length == 0:
+            return size, size
+        start, end = max(0, size - suffix_length), size - 1
+    else:
+        return None
+    return start, min(end, size - 1)
+
+
+class FileRangeResponse(Response):
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self, path: PathLike, start: int, end: int, size: int, headers: Dict[str, str]
+    ) -> None:
+        self.path = path
+        self.start = start
+        self.end = end
+        self.status_code = 206
+        self.background = None
+        self.init_headers(
+            {
+                **headers,
+                "content-length": str(end - start + 1),
+                "content-range": f"bytes {start}-{end}/{size}",
+            }
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers}
+        )
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        remaining = self.end - self.start + 1
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": remaining > 0}
+                )
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+class MediaFiles(StaticFiles):
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        path = Path(full_path)
+        etag = _media_etag(path, stat_result)
+        headers = {
+            "cache-control": MEDIA_CACHE_CONTROL,
+            "content-type": guess_type(path.name)[0] or "application/octet-stream",
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "accept-ranges": "bytes",
+        }
+        if path.suffix in COMPRESSIBLE_EXTENSIONS:
+            headers["vary"] = "Accept-Encoding"
+
+        if self.is_not_modified(headers, request_headers):
+            return NotModifiedResponse(headers)
+
+        if settings.media_accel_redirect_prefix:
+            # nginx streams the file itself (sendfile, ranges, gzip_static).
+            relative = quote(self.get_path(scope).replace(os.sep, "/"))
+            headers["x-accel-redirect"] = f"{settings.media_accel_redirect_prefix}/{relative}"
+            return Response(status_code=status_code, headers=headers)
+
+        if "vary" in headers:
+            accepted = request_headers.get("accept-encoding", "")
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+                if encoding not in accepted:
+                    continue
+                encoded_path = path.with_name(f"{path.name}{suffix}")
+                try:
+                    encoded_stat = os.stat(encoded_path)
+                except FileNotFoundError:
+                    continue
+                headers["content-encoding"] = encoding
+                headers["etag"] = f'{etag[:-1]}-{encoding}"'
+                headers.pop("accept-ranges")
+                return FileResponse(
+                    encoded_path,
+                    status_code=status_code,
+                    headers=headers,
+                    stat_result=encoded_stat,
+                )
+
+        range_header = request_headers.get("range")
+        if_range = request_headers.get("if-range")
+        if range_header and status_code == 200 and if_range in (None, etag):
+            size = stat_result.st_size
+            byte_range = _parse_byte_range(range_header, size)
+            if byte_range is not None:
+                start, end = byte_range
+                if start >= size:
+                    return Response(
+                        status_code=416,
+                        headers={**headers, "content-range": f"bytes */{size}"},
+                    )
+                return FileRangeResponse(full_path, start, end, size, headers)
+
+        return FileResponse(
+            full_path, status_code=status_code, headers=headers, stat_result=stat_result
+        )
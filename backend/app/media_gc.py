@@ -0,0 +1,121 @@
+import argparse
+import asyncio
+import logging
+import posixpath
+import time
+from typing import Iterable, List, Set, Tuple
+from urllib.parse import urlsplit
+
+from sqlalchemy import distinct, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from .config import get_settings
+from .database import AsyncSessionLocal
+from .media import PRECOMPRESSED_SUFFIXES
+from .models import Category, OrderItem, Product
+from .storage import is_safe_key, media_storage
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MEDIA_GC_BATCH_SIZE = 500
+PRECOMPRESSED_FILE_SUFFIXES = frozenset(PRECOMPRESSED_SUFFIXES.values())
+
+
+def _reference_key(url: str) -> str | None:
+    key = media_storage.key_for_url(url)
+    if key is not None:
+        return key
+    # Rows written under an older public base or storage backend still end in the
+    # storage key, ``<subdir>/<filename>``, whatever host or prefix came before it.
+    parts = [part for part in urlsplit(url).path.split("/") if part]
+    if len(parts) < 2:
+        return None
+    key = "/".join(parts[-2:])
+    return key if is_safe_key(key) else None
+
+
+async def load_referenced_media(session: AsyncSession) -> Tuple[Set[str], List[str]]:
+    referenced: Set[str] = set()
+    unmapped: List[str] = []
+    for column in (Product.image_path, Category.image_path, OrderItem.product_image_path):
+        result = await session.execute(select(distinct(column)).where(column.is_not(None)))
+        for url in result.scalars():
+            key = _reference_key(url)
+            if key is None:
+                unmapped.append(url)
+            else:
+                referenced.add(key)
+    return referenced, unmapped
+
+
+def _split_key(key: str) -> Tuple[str, str, str]:
+    directory, filename = posixpath.split(key)
+    stem, extension = posixpath.splitext(filename)
+    return directory, stem, extension
+
+
+def _find_unreferenced(
+    objects: Iterable[Tuple[str, float]], referenced: Set[str], cutoff: float
+) -> List[str]:
+    # Variants are named ``<original stem>_<variant>.webp`` and live with their original.
+    referenced_stems: Set[Tuple[str, str]] = {_split_key(key)[:2] for key in referenced}
+    unreferenced: List[str] = []
+    for key, modified in objects:
+        if key in referenced:
+            continue
+        directory, stem, extension = _split_key(key)
+        if extension in PRECOMPRESSED_FILE_SUFFIXES and posixpath.splitext(key)[0] in referenced:
+            continue
+        if extension == ".webp":
+            original_stem = stem.rpartition("_")[0]
+            if original_stem and (directory, original_stem) in referenced_stems:
+                continue
+        if modified < cutoff:
+            unreferenced.append(key)
+    return unreferenced
+
+
+def _scan_storage(referenced: Set[str], cutoff: float) -> List[str]:
+    return _find_unreferenced(media_storage.list_objects(), referenced, cutoff)
+
+
+async def collect_media_garbage(dry_run: bool = False) -> int:
+    async with AsyncSessionLocal() as session:
+        referenced, unmapped = await load_referenced_media(session)
+
+    if unmapped:
+        # A reference we cannot map might point at any stored file, so nothing is safe to delete.
+        for url in unmapped:
+            logger.error("Cannot map referenced media URL to a storage key: %s", url)
+        logger.error("Refusing to delete media while %s references are unmapped", len(unmapped))
+        return 0
+
+    # Files younger than the grace period may belong to uploads that are not committed yet.
+    cutoff = time.time() - settings.media_gc_grace_hours * 3600
+    candidates = await run_in_threadpool(_scan_storage, referenced, cutoff)
+    if dry_run:
+        for key in candidates:
+            logger.info("Unreferenced media file: %s", key)
+        return len(candidates)
+
+    removed = 0
+    for start in range(0, len(candidates), MEDIA_GC_BATCH_SIZE):
+        batch = candidates[start:start + MEDIA_GC_BATCH_SIZE]
+        removed += await run_in_threadpool(media_storage.delete, batch, cutoff)
+        logger.info("Removed %s of %s unreferenced media files", removed, len(candidates))
+    return removed
+
+
+async def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Delete media files no row references.")
+    parser.add_argument("--dry-run", action="store_true", help="only list unreferenced files")
+    args = parser.parse_args()
+    count = await collect_media_garbage(dry_run=args.dry_run)
+    logger.info("%s unreferenced media files %s", count, "found" if args.dry_run else "removed")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,161 @@
+"""baseline schema
+
+Creates the original tables on an empty database. Databases that were set up
+by the old startup patching get those patches applied once instead.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+LEGACY_PATCHES = (
+    "ALTER TABLE categories ADD COLUMN IF NOT EXISTS image_path VARCHAR(512)",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS image_path VARCHAR(512)",
+    "ALTER TABLE products ADD COLUMN IF NOT EXISTS detail TEXT",
+    "ALTER TABLE users ALTER COLUMN telegram_id TYPE BIGINT USING telegram_id::bigint",
+    "ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_product_id_fkey",
+    "ALTER TABLE order_items ALTER COLUMN product_id DROP NOT NULL",
+    "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS product_name VARCHAR(255)",
+    "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS product_image_path VARCHAR(512)",
+    "ALTER TABLE order_items ADD COLUMN IF NOT EXISTS product_detail TEXT",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS phone_number_normalized VARCHAR(32)",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS is_admin BOOLEAN DEFAULT FALSE",
+    """
+    UPDATE order_items
+    SET
+        product_name = COALESCE(order_items.product_name, products.name),
+        product_detail = COALESCE(order_items.product_detail, products.detail),
+        product_image_path = COALESCE(order_items.product_image_path, products.image_path)
+    FROM products
+    WHERE order_items.product_id = products.id
+      AND (
+        order_items.product_name IS NULL
+        OR order_items.product_detail IS NULL
+        OR order_items.product_image_path IS NULL
+      )
+    """,
+    "UPDATE order_items SET product_name = '' WHERE product_name IS NULL",
+    "ALTER TABLE order_items ALTER COLUMN product_name SET NOT NULL",
+    "UPDATE users SET phone_number_normalized = regexp_replace(phone_number, '\\D', '', 'g') "
+    "WHERE phone_number IS NOT NULL AND phone_number_normalized IS NULL",
+    "UPDATE users SET is_admin = FALSE WHERE is_admin IS NULL",
+    "ALTER TABLE users ALTER COLUMN is_admin SET DEFAULT FALSE",
+    "ALTER TABLE users ALTER COLUMN is_admin SET NOT NULL",
+    "ALTER TABLE users ALTER COLUMN phone_number_normalized SET NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_users_phone_number_normalized "
+    "ON users (phone_number_normalized)",
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table("users"):
+        for statement in LEGACY_PATCHES:
+            op.execute(statement)
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("telegram_id", sa.BigInteger(), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("phone_number", sa.String(length=32), nullable=False),
+        sa.Column("phone_number_normalized", sa.String(length=32), nullable=False),
+        sa.Column("language", sa.String(length=10), nullable=False),
+        sa.Column("is_admin", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+    op.create_index("ix_users_phone_number_normalized", "users", ["phone_number_normalized"])
+
+    op.create_table(
+        "categories",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("image_path", sa.String(length=512), nullable=True),
+    )
+    op.create_index("ix_categories_id", "categories", ["id"])
+
+    op.create_table(
+        "products",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "category_id",
+            sa.Integer(),
+            sa.ForeignKey("categories.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column("price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("image_path", sa.String(length=512), nullable=True),
+        sa.Column("detail", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_products_id", "products", ["id"])
+
+    op.create_table(
+        "orders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "user_id",
+            sa.Integer(),
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum("pending", "completed", name="order_status"),
+            nullable=False,
+        ),
+        sa.Column("total_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("comment", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_orders_id", "orders", ["id"])
+
+    op.create_table(
+        "order_items",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "order_id",
+            sa.Integer(),
+            sa.ForeignKey("orders.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("product_id", sa.Integer(), nullable=True),
+        sa.Column("product_name", sa.String(length=255), nullable=False),
+        sa.Column("product_image_path", sa.String(length=512), nullable=True),
+        sa.Column("product_detail", sa.Text(), nullable=True),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("unit_price", sa.Numeric(10, 2), nullable=False),
+        sa.Column("total_price", sa.Numeric(10, 2), nullable=False),
+    )
+    op.create_index("ix_order_items_id", "order_items", ["id"])
+
+    op.create_table(
+        "admin_phone_numbers",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("phone_number", sa.String(length=32), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_admin_phone_numbers_id", "admin_phone_numbers", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("admin_phone_numbers")
+    op.drop_table("order_items")
+    op.drop_table("orders")
+    op.drop_table("products")
+    op.drop_table("categories")
+    op.drop_table("users")
+    sa.Enum(name="order_status").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,34 @@
+"""order listing indexes
+
+Revision ID: 0002_order_listing_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+
+
+revision = "0002_order_listing_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_orders_user_id")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_orders_created_at_id ON orders (created_at, id)")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_orders_status_created_at_id "
+        "ON orders (status, created_at, id)"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_orders_user_id_created_at_id "
+        "ON orders (user_id, created_at, id)"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_order_items_order_id ON order_items (order_id)")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_order_items_order_id", table_name="order_items")
+    op.drop_index("ix_orders_user_id_created_at_id", table_name="orders")
+    op.drop_index("ix_orders_status_created_at_id", table_name="orders")
+    op.drop_index("ix_orders_created_at_id", table_name="orders")
@@ -0,0 +1,42 @@
+"""order idempotency keys
+
+Revision ID: 0003_order_idempotency_keys
+Revises: 0002_order_listing_indexes
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_order_idempotency_keys"
+down_revision = "0002_order_listing_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("order_idempotency_keys"):
+        return
+
+    op.create_table(
+        "order_idempotency_keys",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("key", sa.String(length=255), nullable=False, unique=True),
+        sa.Column("request_hash", sa.String(length=64), nullable=False),
+        sa.Column(
+            "order_id",
+            sa.Integer(),
+            sa.ForeignKey("orders.id", ondelete="CASCADE"),
+            nullable=True,
+        ),
+        sa.Column("response", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_order_idempotency_keys_id", "order_idempotency_keys", ["id"])
+    op.create_index(
+        "ix_order_idempotency_keys_created_at", "order_idempotency_keys", ["created_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("order_idempotency_keys")
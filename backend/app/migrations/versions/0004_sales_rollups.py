@@ -0,0 +1,58 @@
+"""daily sales rollups
+
+Revision ID: 0004_sales_rollups
+Revises: 0003_order_idempotency_keys
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_sales_rollups"
+down_revision = "0003_order_idempotency_keys"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("sales_daily_totals"):
+        op.create_table(
+            "sales_daily_totals",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("status", sa.String(length=32), nullable=False),
+            sa.Column("order_count", sa.Integer(), nullable=False),
+            sa.Column("revenue", sa.Numeric(14, 2), nullable=False),
+            sa.UniqueConstraint("day", "status", name="uq_sales_daily_totals_day_status"),
+        )
+        op.create_index("ix_sales_daily_totals_id", "sales_daily_totals", ["id"])
+
+    if not inspector.has_table("sales_daily_products"):
+        op.create_table(
+            "sales_daily_products",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("status", sa.String(length=32), nullable=False),
+            sa.Column("product_id", sa.Integer(), nullable=False),
+            sa.Column("category_id", sa.Integer(), nullable=False),
+            sa.Column("product_name", sa.String(length=255), nullable=False),
+            sa.Column("quantity", sa.Integer(), nullable=False),
+            sa.Column("revenue", sa.Numeric(14, 2), nullable=False),
+            sa.UniqueConstraint(
+                "day",
+                "status",
+                "product_id",
+                name="uq_sales_daily_products_day_status_product",
+            ),
+        )
+        op.create_index("ix_sales_daily_products_id", "sales_daily_products", ["id"])
+        op.create_index(
+            "ix_sales_daily_products_category_id", "sales_daily_products", ["category_id"]
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("sales_daily_products")
+    op.drop_table("sales_daily_totals")
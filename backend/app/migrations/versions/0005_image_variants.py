@@ -0,0 +1,24 @@
+"""image variants
+
+Revision ID: 0005_image_variants
+Revises: 0004_sales_rollups
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_image_variants"
+down_revision = "0004_sales_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("categories", sa.Column("image_variants", sa.JSON(), nullable=True))
+    op.add_column("products", sa.Column("image_variants", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("products", "image_variants")
+    op.drop_column("categories", "image_variants")
@@ -0,0 +1,106 @@
+"""sharded sales rollups keyed by order item snapshots
+
+Revision ID: 0006_sales_rollup_keys
+Revises: 0005_image_variants
+Create Date: 2026-10-17 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_sales_rollup_keys"
+down_revision = "0005_image_variants"
+branch_labels = None
+depends_on = None
+
+SALES_ROLLUP_SHARDS = 16
+
+
+def upgrade() -> None:
+    op.add_column("order_items", sa.Column("sales_product_id", sa.Integer(), nullable=True))
+    op.add_column("order_items", sa.Column("sales_category_id", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE order_items
+        SET
+            sales_product_id = COALESCE(order_items.product_id, 0),
+            sales_category_id = COALESCE(
+                (SELECT products.category_id FROM products WHERE products.id = order_items.product_id),
+                0
+            )
+        """
+    )
+
+    op.add_column(
+        "sales_daily_totals",
+        sa.Column("shard", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "sales_daily_products",
+        sa.Column("shard", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.drop_constraint("uq_sales_daily_totals_day_status", "sales_daily_totals", type_="unique")
+    op.drop_constraint(
+        "uq_sales_daily_products_day_status_product", "sales_daily_products", type_="unique"
+    )
+
+    # Existing rows were keyed by the live product, so they are rebuilt from the snapshots.
+    op.execute("DELETE FROM sales_daily_totals")
+    op.execute("DELETE FROM sales_daily_products")
+    op.create_unique_constraint(
+        "uq_sales_daily_totals_day_status_shard",
+        "sales_daily_totals",
+        ["day", "status", "shard"],
+    )
+    op.create_unique_constraint(
+        "uq_sales_daily_products_key",
+        "sales_daily_products",
+        ["day", "status", "product_id", "category_id", "shard"],
+    )
+    op.execute(
+        f"""
+        INSERT INTO sales_daily_totals (day, status, shard, order_count, revenue)
+        SELECT created_at::date, status::text, id % {SALES_ROLLUP_SHARDS}, COUNT(*), SUM(total_price)
+        FROM orders
+        GROUP BY 1, 2, 3
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO sales_daily_products
+            (day, status, product_id, category_id, shard, product_name, quantity, revenue)
+        SELECT
+            orders.created_at::date,
+            orders.status::text,
+            order_items.sales_product_id,
+            order_items.sales_category_id,
+            orders.id % {SALES_ROLLUP_SHARDS},
+            MAX(order_items.product_name),
+            SUM(order_items.quantity),
+            SUM(order_items.total_price)
+        FROM order_items
+        JOIN orders ON orders.id = order_items.order_id
+        GROUP BY 1, 2, 3, 4, 5
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_sales_daily_products_key", "sales_daily_products", type_="unique")
+    op.drop_constraint(
+        "uq_sales_daily_totals_day_status_shard", "sales_daily_totals", type_="unique"
+    )
+    op.execute("DELETE FROM sales_daily_totals")
+    op.execute("DELETE FROM sales_daily_products")
+    op.drop_column("sales_daily_products", "shard")
+    op.drop_column("sales_daily_totals", "shard")
+    op.create_unique_constraint(
+        "uq_sales_daily_totals_day_status", "sales_daily_totals", ["day", "status"]
+    )
+    op.create_unique_constraint(
+        "uq_sales_daily_products_day_status_product",
+        "sales_daily_products",
+        ["day", "status", "product_id"],
+    )
+    op.drop_column("order_items", "sales_category_id")
+    op.drop_column("order_items", "sales_product_id")
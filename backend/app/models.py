@@ -1,16 +1,20 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
 from sqlalchemy import (
     BigInteger,
     Boolean,
+    Date,
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
+    JSON,
     Numeric,
     String,
     Text,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -40,6 +44,7 @@ class Category(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     image_path: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    image_variants: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
     products: Mapped[list["Product"]] = relationship(back_populates="category", cascade="all, delete-orphan")
 
@@ -52,6 +57,7 @@ class Product(Base):
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     price: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     image_path: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    image_variants: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     detail: Mapped[str | None] = mapped_column(Text, nullable=True)
 
     category: Mapped[Category] = relationship(back_populates="products")
@@ -71,13 +77,22 @@ class Order(Base):
     user: Mapped[User] = relationship(back_populates="orders")
     items: Mapped[list["OrderItem"]] = relationship(back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_orders_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
 
 class OrderItem(Base):
     __tablename__ = "order_items"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"))
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), index=True)
     product_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Rollup keys the item was counted under; they outlive product deletes and moves.
+    sales_product_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    sales_category_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
     product_name: Mapped[str] = mapped_column(String(255), nullable=False)
     product_image_path: Mapped[str | None] = mapped_column(String(512), nullable=True)
     product_detail: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -94,3 +109,68 @@ class AdminPhoneNumber(Base):
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     phone_number: Mapped[str] = mapped_column(String(32), unique=True, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AppState(Base):
+    __tablename__ = "app_state"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    value: Mapped[str] = mapped_column(String(128), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+
+class OrderIdempotencyKey(Base):
+    __tablename__ = "order_idempotency_keys"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    key: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)
+    order_id: Mapped[int | None] = mapped_column(
+        ForeignKey("orders.id", ondelete="CASCADE"), nullable=True
+    )
+    response: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, nullable=False, index=True
+    )
+
+
+class SalesDailyTotal(Base):
+    __tablename__ = "sales_daily_totals"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    order_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal("0.00"))
+
+    __table_args__ = (
+        UniqueConstraint("day", "status", "shard", name="uq_sales_daily_totals_day_status_shard"),
+    )
+
+
+class SalesDailyProduct(Base):
+    __tablename__ = "sales_daily_products"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(String(32), nullable=False)
+    product_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    category_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    shard: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    product_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    revenue: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=Decimal("0.00"))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "day",
+            "status",
+            "product_id",
+            "category_id",
+            "shard",
+            name="uq_sales_daily_products_key",
+        ),
+    )
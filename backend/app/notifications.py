@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Callable, Dict, List
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .database import asyncpg_dsn
+
+try:  # pragma: no cover - asyncpg optional at runtime
+    import asyncpg
+except ImportError:  # pragma: no cover - fallback if asyncpg missing
+    asyncpg = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_INVALIDATION_CHANNEL = "cache_invalidation"
+CATALOG_CACHE_KEY = "catalog"
+ADMIN_CACHE_KEY = "admins"
+LISTENER_RETRY_DELAY = 5.0
+
+NotificationHandler = Callable[[str | None], None]
+
+
+async def notify(session: AsyncSession, channel: str, payload: str) -> None:
+    # Delivered by Postgres only if the surrounding transaction commits.
+    await session.execute(select(func.pg_notify(channel, payload)))
+
+
+class PostgresListener:
+    def __init__(self) -> None:
+        self._handlers: Dict[str, List[NotificationHandler]] = {}
+        self._task: asyncio.Task | None = None
+
+    def add_handler(self, channel: str, handler: NotificationHandler) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def _dispatch(self, _connection, _pid, channel: str, payload: str | None) -> None:
+        for handler in self._handlers.get(channel, ()):
+            try:
+                handler(payload)
+            except Exception:  # pragma: no cover - one bad handler must not stop the rest
+                logger.exception("Notification handler for %s failed", channel)
+
+    async def _listen(self) -> None:
+        connected_before = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(asyncpg_dsn())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._dispatch)
+                if connected_before:
+                    # Notifications sent while disconnected are lost; handlers get ``None``.
+                    for channel in self._handlers:
+                        self._dispatch(connection, None, channel, None)
+                connected_before = True
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _conn: closed.set())
+                await closed.wait()
+                logger.warning("Notification listener connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Notification listener failed: %s", exc)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(LISTENER_RETRY_DELAY)
+
+    def start(self) -> None:
+        if asyncpg is None or self._task is not None or not self._handlers:
+            return
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+pg_listener = PostgresListener()
@@ -1,3 +1,3 @@
-from . import categories, orders, products, users
+from . import analytics, auth, catalog, categories, media, metrics, orders, products, users
 
-__all__ = ["categories", "orders", "products", "users"]
+__all__ = ["analytics", "auth", "catalog", "categories", "media", "metrics", "orders", "products", "users"]
@@ -0,0 +1,27 @@
+from datetime import date
+from typing import List, Literal
+
+from fastapi import APIRouter, Depends, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..analytics import sales_breakdown
+from ..database import get_session
+from ..schemas import SalesBreakdownRead
+from ..utils import ensure_admin
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+@router.get("/sales", response_model=List[SalesBreakdownRead])
+async def get_sales(
+    group_by: Literal["day", "category", "product"] = "day",
+    date_from: date | None = None,
+    date_to: date | None = None,
+    status: str | None = None,
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    return await sales_breakdown(session, group_by, date_from, date_to, status)
@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth import issue_session_token, verify_init_data
+from ..database import get_session
+from ..schemas import TelegramSessionCreate, TelegramSessionRead
+from ..utils import is_session_user_admin
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+
+@router.post("/session", response_model=TelegramSessionRead)
+async def create_session(
+    payload: TelegramSessionCreate, session: AsyncSession = Depends(get_session)
+):
+    telegram_user = verify_init_data(payload.init_data)
+    telegram_id = telegram_user["id"]
+
+    is_admin = await is_session_user_admin(session, telegram_id)
+
+    token, claims = issue_session_token(telegram_id, is_admin)
+    return TelegramSessionRead(
+        token=token,
+        expires_at=datetime.utcfromtimestamp(claims.expires_at),
+        telegram_id=telegram_id,
+        is_admin=is_admin,
+    )
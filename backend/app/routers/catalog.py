@@ -0,0 +1,30 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Header, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..catalog import catalog_cache
+from ..database import get_read_session
+from ..schemas import CatalogCategoryRead
+from ..utils import CATALOG_CACHE_CONTROL, conditional_response
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+
+@router.get("", response_class=Response, responses={200: {"model": List[CatalogCategoryRead]}})
+async def get_catalog(
+    response: Response,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    snapshot = await catalog_cache.get(session)
+    not_modified = conditional_response(
+        response, snapshot.catalog_etag, if_none_match, CATALOG_CACHE_CONTROL
+    )
+    if not_modified is not None:
+        return not_modified
+    return Response(
+        content=snapshot.catalog_body,
+        media_type="application/json",
+        headers={"ETag": snapshot.catalog_etag, "Cache-Control": CATALOG_CACHE_CONTROL},
+    )
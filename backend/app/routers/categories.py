@@ -1,41 +1,58 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Response, UploadFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_session
+from ..catalog import catalog_cache
+from ..database import get_read_session, get_session
+from ..image_variants import image_variants
 from ..models import Category
 from ..schemas import CategoryRead
-from ..utils import ensure_admin, save_upload_file
+from ..utils import CATALOG_CACHE_CONTROL, conditional_response, ensure_admin, store_image
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
 @router.get("", response_model=List[CategoryRead])
-async def list_categories(session: AsyncSession = Depends(get_session)):
-    result = await session.execute(select(Category))
-    categories = result.scalars().all()
-    return categories
+async def list_categories(
+    response: Response,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    snapshot = await catalog_cache.get(session)
+    not_modified = conditional_response(
+        response, snapshot.categories_etag, if_none_match, CATALOG_CACHE_CONTROL
+    )
+    if not_modified is not None:
+        return not_modified
+    return snapshot.categories
 
 
 @router.post("", response_model=CategoryRead)
 async def create_category(
     name: str = Form(...),
     image: UploadFile | None = File(default=None),
+    image_key: str | None = Form(default=None),
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     category = Category(name=name)
-    if image:
-        category.image_path = save_upload_file(image, "categories")
+    image_url = await store_image(image, image_key, "categories")
+    if image_url:
+        category.image_path = image_url
+        category.image_variants = None
 
     session.add(category)
+    await catalog_cache.notify_changed(session)
     await session.commit()
     await session.refresh(category)
+    await catalog_cache.refresh(session)
+    if image_url:
+        image_variants.schedule(Category, category.id, category.image_path)
     return category
 
 
@@ -44,22 +61,30 @@ async def update_category(
     category_id: int,
     name: str = Form(...),
     image: UploadFile | None = File(default=None),
+    image_key: str | None = Form(default=None),
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     category = await session.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     category.name = name
-    if image:
-        category.image_path = save_upload_file(image, "categories")
+    image_url = await store_image(image, image_key, "categories")
+    if image_url:
+        category.image_path = image_url
+        category.image_variants = None
 
+    await catalog_cache.notify_changed(session)
     await session.commit()
     await session.refresh(category)
+    await catalog_cache.refresh(session)
+    if image_url:
+        image_variants.schedule(Category, category.id, category.image_path)
     return category
 
 
@@ -68,14 +93,17 @@ async def delete_category(
     category_id: int,
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     category = await session.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     await session.delete(category)
+    await catalog_cache.notify_changed(session)
     await session.commit()
+    await catalog_cache.refresh(session)
     return {"detail": "Category deleted"}
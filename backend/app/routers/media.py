@@ -0,0 +1,48 @@
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from ..database import get_session
+from ..schemas import MediaUploadCreate, MediaUploadRead
+from ..storage import media_key, media_storage
+from ..utils import max_upload_bytes, upload_too_large, ensure_admin
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+
+@router.post("/uploads", response_model=MediaUploadRead)
+async def create_media_upload(
+    payload: MediaUploadCreate,
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    await session.close()
+
+    if payload.size > max_upload_bytes():
+        raise upload_too_large()
+
+    extension = Path(payload.filename).suffix.lower()
+    key = media_key(payload.kind, f"{payload.sha256}{extension}")
+    media_url = media_storage.url_for(key)
+    # An existing blob is touched so the media GC grace period covers the client attaching it.
+    if await run_in_threadpool(media_storage.touch, key):
+        return MediaUploadRead(key=key, media_url=media_url, exists=True)
+
+    presigned = await run_in_threadpool(
+        media_storage.presign_upload, key, payload.content_type, payload.size, payload.sha256
+    )
+    if presigned is None:
+        raise HTTPException(status_code=501, detail="Direct uploads are not supported")
+    return MediaUploadRead(
+        key=key,
+        media_url=media_url,
+        exists=False,
+        upload_url=presigned.url,
+        method=presigned.method,
+        headers=presigned.headers,
+    )
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Header
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..database import engine, get_session, read_engine
+from ..db_metrics import db_metrics
+from ..schemas import DatabaseStatsRead
+from ..utils import ensure_admin
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("/database", response_model=DatabaseStatsRead)
+async def get_database_stats(
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    await session.close()
+    read_pool = read_engine.pool if read_engine is not engine else None
+    return db_metrics.snapshot(engine.pool, read_pool)
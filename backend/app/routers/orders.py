@@ -1,21 +1,68 @@
+import base64
+import binascii
+from datetime import datetime
 from decimal import Decimal
-from typing import List
+from typing import List, Literal
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from ..database import get_session
+from ..analytics import apply_order_to_rollups
+from ..auth import claims_from_authorization
+from ..database import get_read_session, get_session, read_your_writes, user_pin_key
+from ..events import (
+    SSE_HEADERS,
+    build_order_event,
+    publish_order_event,
+    stream_order_events,
+)
+from ..exports import EXPORT_MEDIA_TYPES, iter_order_export
+from ..idempotency import claim_idempotency_key, hash_order_request, store_idempotent_response
 from ..models import Order, OrderItem, Product, User
-from ..schemas import OrderCreate, OrderRead, OrderStatusUpdate
-from ..utils import ensure_admin
+from ..schemas import OrderCreate, OrderRead, OrderStatus, OrderStatusUpdate
+from ..utils import (
+    PRIVATE_CACHE_CONTROL,
+    conditional_response,
+    ensure_admin,
+    make_etag,
+    naive_utc,
+)
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_cursor(order: Order) -> str:
+    raw = f"{order.created_at.isoformat()}|{order.id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, order_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return naive_utc(datetime.fromisoformat(created_at)), int(order_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from exc
+
 
 @router.post("", response_model=OrderRead)
-async def create_order(payload: OrderCreate, session: AsyncSession = Depends(get_session)):
+async def create_order(
+    payload: OrderCreate,
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key"),
+    session: AsyncSession = Depends(get_session),
+):
+    if idempotency_key is not None:
+        stored = await claim_idempotency_key(
+            session, idempotency_key, hash_order_request(payload)
+        )
+        if stored is not None:
+            return stored
+
     user = await session.get(User, payload.user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -23,44 +70,70 @@ async def create_order(payload: OrderCreate, session: AsyncSession = Depends(get
     if not payload.items:
         raise HTTPException(status_code=400, detail="Order must contain at least one item")
 
-    order = Order(user_id=user.id, comment=payload.comment)
-    session.add(order)
-    total = Decimal("0.00")
+    product_ids = {item.product_id for item in payload.items}
+    products_result = await session.execute(select(Product).where(Product.id.in_(product_ids)))
+    products = {product.id: product for product in products_result.scalars()}
 
     for item in payload.items:
-        product = await session.get(Product, item.product_id)
-        if not product:
+        if item.product_id not in products:
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
+
+    order = Order(user=user, comment=payload.comment, items=[])
+    total = Decimal("0.00")
+
+    for item in payload.items:
+        product = products[item.product_id]
         unit_price = Decimal(product.price)
         item_total = unit_price * item.quantity
-        order_item = OrderItem(
-            order=order,
-            product_id=product.id,
-            product_name=product.name,
-            product_image_path=product.image_path,
-            product_detail=product.detail,
-            quantity=item.quantity,
-            unit_price=unit_price,
-            total_price=item_total,
+        order.items.append(
+            OrderItem(
+                product_id=product.id,
+                sales_product_id=product.id,
+                sales_category_id=product.category_id,
+                product_name=product.name,
+                product_image_path=product.image_path,
+                product_detail=product.detail,
+                quantity=item.quantity,
+                unit_price=unit_price,
+                total_price=item_total,
+            )
         )
-        session.add(order_item)
         total += item_total
 
     order.total_price = total
+    session.add(order)
+    await session.flush()
+
+    response = OrderRead.model_validate(order)
+    if idempotency_key is not None:
+        await store_idempotent_response(session, idempotency_key, order.id, response)
+    await publish_order_event(session, build_order_event("order_created", order))
+    await apply_order_to_rollups(session, order, order.status, 1)
+
     await session.commit()
-    await session.refresh(order)
-    await session.refresh(order, attribute_names=["items", "user"])
-    return order
+    read_your_writes.mark(user_pin_key(order.user_id))
+    return response
 
 
 @router.get("", response_model=List[OrderRead])
 async def list_orders(
-    status: str | None = None,
+    response: Response,
+    status: OrderStatus | None = None,
+    user_id: int | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=500),
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    # The admin panel reloads this list on every order event, so it reads from the primary:
+    # a lagging replica would show the order before the event that announced it.
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    created_from = naive_utc(created_from)
+    created_to = naive_utc(created_to)
 
     stmt = (
         select(Order)
@@ -68,38 +141,133 @@ async def list_orders(
             selectinload(Order.user),
             selectinload(Order.items),
         )
-        .order_by(Order.created_at.desc())
+        .order_by(Order.created_at.desc(), Order.id.desc())
+        .limit(limit + 1)
     )
     if status:
         stmt = stmt.where(Order.status == status)
+    if user_id is not None:
+        stmt = stmt.where(Order.user_id == user_id)
+    if created_from is not None:
+        stmt = stmt.where(Order.created_at >= created_from)
+    if created_to is not None:
+        stmt = stmt.where(Order.created_at < created_to)
+    if cursor:
+        cursor_created_at, cursor_id = _decode_cursor(cursor)
+        stmt = stmt.where(tuple_(Order.created_at, Order.id) < tuple_(cursor_created_at, cursor_id))
 
     result = await session.execute(stmt)
     orders = result.scalars().unique().all()
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(orders[-1])
     return orders
 
 
+@router.get("/export")
+async def export_orders(
+    format: Literal["csv", "ndjson"] = "csv",
+    status: OrderStatus | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    await session.close()
+
+    filename = f"orders-{datetime.utcnow():%Y%m%d%H%M%S}.{format}"
+    return StreamingResponse(
+        iter_order_export(format, status, naive_utc(created_from), naive_utc(created_to)),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/events")
+async def stream_all_order_events(
+    request: Request,
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    await session.close()
+
+    return StreamingResponse(
+        stream_order_events(request),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.patch("/{order_id}", response_model=OrderRead)
 async def update_order_status(
     order_id: int,
     payload: OrderStatusUpdate,
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
-    order = await session.get(Order, order_id)
+    # The row lock serializes concurrent status changes, so each transition moves the
+    # order's amounts between rollup rows exactly once.
+    order = await session.get(
+        Order,
+        order_id,
+        options=[selectinload(Order.user), selectinload(Order.items)],
+        with_for_update=True,
+        populate_existing=True,
+    )
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
 
+    previous_status = order.status
     order.status = payload.status
+    await session.flush()
+    await publish_order_event(session, build_order_event("order_status_changed", order))
+    if previous_status != order.status:
+        await apply_order_to_rollups(session, order, previous_status, -1)
+        await apply_order_to_rollups(session, order, order.status, 1)
     await session.commit()
-    await session.refresh(order)
     return order
 
 
 @router.get("/user/{user_id}", response_model=List[OrderRead])
-async def get_user_orders(user_id: int, session: AsyncSession = Depends(get_session)):
+async def get_user_orders(
+    user_id: int,
+    response: Response,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    version_result = await session.execute(
+        select(
+            User.name,
+            User.phone_number,
+            User.language,
+            User.is_admin,
+            func.count(Order.id),
+            func.max(Order.id),
+            func.max(Order.updated_at),
+        )
+        .select_from(User)
+        .outerjoin(Order, Order.user_id == User.id)
+        .where(User.id == user_id)
+        .group_by(User.id)
+    )
+    version = version_result.one_or_none()
+    if version is not None:
+        not_modified = conditional_response(
+            response, make_etag(user_id, *version), if_none_match, PRIVATE_CACHE_CONTROL
+        )
+        if not_modified is not None:
+            return not_modified
+
     stmt = (
         select(Order)
         .options(
@@ -112,3 +280,30 @@ async def get_user_orders(user_id: int, session: AsyncSession = Depends(get_sess
     result = await session.execute(stmt)
     orders = result.scalars().unique().all()
     return orders
+
+
+@router.get("/user/{user_id}/events")
+async def stream_user_order_events(
+    user_id: int,
+    request: Request,
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    claims = claims_from_authorization(authorization)
+    if claims is None or claims.is_admin:
+        await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    else:
+        owner_telegram_id = await session.scalar(
+            select(User.telegram_id).where(User.id == user_id)
+        )
+        if owner_telegram_id != claims.telegram_id:
+            await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+    await session.close()
+
+    return StreamingResponse(
+        stream_order_events(request, user_id),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
@@ -1,26 +1,35 @@
+from datetime import datetime
 from decimal import Decimal
 from typing import List
 
-from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Response, UploadFile
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..database import get_session
-from ..models import Category, OrderItem, Product
+from ..catalog import catalog_cache
+from ..database import get_read_session, get_session
+from ..image_variants import image_variants
+from ..models import Category, Order, OrderItem, Product
 from ..schemas import ProductRead
-from ..utils import ensure_admin, save_upload_file
+from ..utils import CATALOG_CACHE_CONTROL, conditional_response, ensure_admin, store_image
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
 @router.get("", response_model=List[ProductRead])
-async def list_products(category_id: int | None = None, session: AsyncSession = Depends(get_session)):
-    stmt = select(Product)
-    if category_id:
-        stmt = stmt.where(Product.category_id == category_id)
-    result = await session.execute(stmt)
-    products = result.scalars().all()
-    return products
+async def list_products(
+    response: Response,
+    category_id: int | None = None,
+    if_none_match: str | None = Header(default=None, alias="If-None-Match"),
+    session: AsyncSession = Depends(get_read_session),
+):
+    snapshot = await catalog_cache.get(session)
+    not_modified = conditional_response(
+        response, snapshot.products_etag_for(category_id), if_none_match, CATALOG_CACHE_CONTROL
+    )
+    if not_modified is not None:
+        return not_modified
+    return snapshot.products_for(category_id)
 
 
 @router.post("", response_model=ProductRead)
@@ -30,23 +39,31 @@ async def create_product(
     price: float = Form(...),
     detail: str | None = Form(default=None),
     image: UploadFile | None = File(default=None),
+    image_key: str | None = Form(default=None),
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     category = await session.get(Category, category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
 
     product = Product(category_id=category_id, name=name, price=Decimal(str(price)), detail=detail)
-    if image:
-        product.image_path = save_upload_file(image, "products")
+    image_url = await store_image(image, image_key, "products")
+    if image_url:
+        product.image_path = image_url
+        product.image_variants = None
 
     session.add(product)
+    await catalog_cache.notify_changed(session)
     await session.commit()
     await session.refresh(product)
+    await catalog_cache.refresh(session)
+    if image_url:
+        image_variants.schedule(Product, product.id, product.image_path)
     return product
 
 
@@ -58,11 +75,13 @@ async def update_product(
     price: float = Form(...),
     detail: str | None = Form(default=None),
     image: UploadFile | None = File(default=None),
+    image_key: str | None = Form(default=None),
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     product = await session.get(Product, product_id)
     if not product:
@@ -72,11 +91,17 @@ async def update_product(
     product.name = name
     product.price = Decimal(str(price))
     product.detail = detail
-    if image:
-        product.image_path = save_upload_file(image, "products")
+    image_url = await store_image(image, image_key, "products")
+    if image_url:
+        product.image_path = image_url
+        product.image_variants = None
 
+    await catalog_cache.notify_changed(session)
     await session.commit()
     await session.refresh(product)
+    await catalog_cache.refresh(session)
+    if image_url:
+        image_variants.schedule(Product, product.id, product.image_path)
     return product
 
 
@@ -85,17 +110,25 @@ async def delete_product(
     product_id: int,
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     product = await session.get(Product, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
+    await session.execute(
+        update(Order)
+        .where(Order.id.in_(select(OrderItem.order_id).where(OrderItem.product_id == product_id)))
+        .values(updated_at=datetime.utcnow())
+    )
     await session.execute(
         update(OrderItem).where(OrderItem.product_id == product_id).values(product_id=None)
     )
     await session.delete(product)
+    await catalog_cache.notify_changed(session)
     await session.commit()
+    await catalog_cache.refresh(session)
     return {"detail": "Product deleted"}
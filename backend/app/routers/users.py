@@ -1,18 +1,28 @@
+from datetime import datetime
 from typing import List
 
 from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..database import get_session
 from ..models import AdminPhoneNumber, User
 from ..schemas import (
+    AdminPhoneNumberBulkCreate,
+    AdminPhoneNumberBulkResult,
     AdminPhoneNumberCreate,
     AdminPhoneNumberRead,
     UserCreate,
     UserRead,
 )
-from ..utils import ensure_admin, normalize_phone, sync_user_admin_status
+from ..utils import (
+    admin_directory,
+    admin_flag_for,
+    ensure_admin,
+    normalize_phone,
+    resync_admin_flags,
+)
 from ..config import get_settings
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -25,27 +35,29 @@ async def create_or_update_user(payload: UserCreate, session: AsyncSession = Dep
     if not normalized_phone:
         raise HTTPException(status_code=400, detail="Telefon raqamini to'g'ri kiriting")
 
-    result = await session.execute(select(User).where(User.telegram_id == payload.telegram_id))
-    user = result.scalar_one_or_none()
-
-    if user:
-        user.name = payload.name
-        user.phone_number = payload.phone_number
-        user.phone_number_normalized = normalized_phone
-        user.language = payload.language
-    else:
-        user = User(
-            telegram_id=payload.telegram_id,
-            name=payload.name,
-            phone_number=payload.phone_number,
-            phone_number_normalized=normalized_phone,
-            language=payload.language,
-        )
-        session.add(user)
-
-    await sync_user_admin_status(session, user)
+    stmt = insert(User).values(
+        telegram_id=payload.telegram_id,
+        name=payload.name,
+        phone_number=payload.phone_number,
+        phone_number_normalized=normalized_phone,
+        language=payload.language,
+        is_admin=admin_flag_for(payload.telegram_id, normalized_phone),
+        created_at=datetime.utcnow(),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={
+            "name": stmt.excluded.name,
+            "phone_number": stmt.excluded.phone_number,
+            "phone_number_normalized": stmt.excluded.phone_number_normalized,
+            "language": stmt.excluded.language,
+            "is_admin": stmt.excluded.is_admin,
+        },
+    ).returning(User)
+
+    result = await session.execute(stmt, execution_options={"populate_existing": True})
+    user = result.scalar_one()
     await session.commit()
-    await session.refresh(user)
     return user
 
 
@@ -55,8 +67,6 @@ async def get_user(telegram_id: int, session: AsyncSession = Depends(get_session
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    await sync_user_admin_status(session, user)
-    await session.commit()
     return user
 
 
@@ -64,9 +74,10 @@ async def get_user(telegram_id: int, session: AsyncSession = Depends(get_session
 async def list_admin_phone_numbers(
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     entries: List[AdminPhoneNumberRead] = []
     seen: set[str] = set()
@@ -103,9 +114,10 @@ async def add_admin_phone_number(
     payload: AdminPhoneNumberCreate,
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     normalized_phone = normalize_phone(payload.phone_number)
     if not normalized_phone:
@@ -125,14 +137,11 @@ async def add_admin_phone_number(
     session.add(entry)
     await session.flush()
 
-    users_result = await session.execute(
-        select(User).where(User.phone_number_normalized == normalized_phone)
-    )
-    for user in users_result.scalars():
-        await sync_user_admin_status(session, user)
+    await resync_admin_flags(session, [normalized_phone])
 
+    await admin_directory.notify_changed(session)
     await session.commit()
-    await session.refresh(entry)
+    await admin_directory.refresh(session)
 
     return AdminPhoneNumberRead(
         id=entry.id,
@@ -142,14 +151,64 @@ async def add_admin_phone_number(
     )
 
 
+@router.post("/admin-phone-numbers/bulk", response_model=AdminPhoneNumberBulkResult)
+async def add_admin_phone_numbers(
+    payload: AdminPhoneNumberBulkCreate,
+    x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
+    x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
+    session: AsyncSession = Depends(get_session),
+):
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
+
+    candidates: dict[str, None] = {}
+    skipped: List[str] = []
+    for raw_phone in payload.phone_numbers:
+        normalized_phone = normalize_phone(raw_phone)
+        if not normalized_phone or normalized_phone in settings.admin_phone_numbers:
+            skipped.append(raw_phone)
+            continue
+        candidates.setdefault(normalized_phone)
+
+    created: List[AdminPhoneNumberRead] = []
+    if candidates:
+        now = datetime.utcnow()
+        result = await session.execute(
+            insert(AdminPhoneNumber)
+            .values([{"phone_number": phone, "created_at": now} for phone in candidates])
+            .on_conflict_do_nothing(index_elements=[AdminPhoneNumber.phone_number])
+            .returning(
+                AdminPhoneNumber.id, AdminPhoneNumber.phone_number, AdminPhoneNumber.created_at
+            )
+        )
+        created = [
+            AdminPhoneNumberRead(
+                id=entry_id, phone_number=phone, source="database", created_at=created_at
+            )
+            for entry_id, phone, created_at in result.all()
+        ]
+        inserted = {entry.phone_number for entry in created}
+        skipped.extend(phone for phone in candidates if phone not in inserted)
+        await resync_admin_flags(session, list(inserted))
+
+    if created:
+        await admin_directory.notify_changed(session)
+    await session.commit()
+    if created:
+        await admin_directory.refresh(session)
+
+    return AdminPhoneNumberBulkResult(created=created, skipped=skipped)
+
+
 @router.delete("/admin-phone-numbers/{admin_phone_id}")
 async def remove_admin_phone_number(
     admin_phone_id: int,
     x_telegram_user_id: int | None = Header(default=None, alias="X-Telegram-User-Id"),
     x_admin_phone_number: str | None = Header(default=None, alias="X-Admin-Phone-Number"),
+    authorization: str | None = Header(default=None),
     session: AsyncSession = Depends(get_session),
 ):
-    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number)
+    await ensure_admin(session, x_telegram_user_id, x_admin_phone_number, authorization)
 
     entry = await session.get(AdminPhoneNumber, admin_phone_id)
     if not entry:
@@ -159,12 +218,10 @@ async def remove_admin_phone_number(
     await session.delete(entry)
     await session.flush()
 
-    users_result = await session.execute(
-        select(User).where(User.phone_number_normalized == normalized_phone)
-    )
-    for user in users_result.scalars():
-        await sync_user_admin_status(session, user)
+    await resync_admin_flags(session, [normalized_phone])
 
+    await admin_directory.notify_changed(session)
     await session.commit()
+    await admin_directory.refresh(session)
 
     return {"detail": "Administrator o'chirildi"}
@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, List, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+def combine_prefix(public_root: str, prefix: str) -> str:
+    if not public_root or public_root == "/":
+        return prefix
+    if not prefix or prefix == "/":
+        return public_root
+    return f"{public_root}{prefix}"
+
+
+def build_prefix_aliases(
+    api_prefix: str, additional_prefixes: Iterable[str], public_roots: Iterable[str]
+) -> Dict[str, str]:
+    # Every public spelling of the API maps onto the one prefix the routers are mounted at.
+    canonical = "" if api_prefix == "/" else api_prefix
+    prefixes = [api_prefix, *additional_prefixes]
+    aliases: Dict[str, str] = {}
+    for public_root in ("", *public_roots):
+        for prefix in prefixes:
+            alias = combine_prefix(public_root, prefix)
+            alias = "" if alias == "/" else alias
+            if alias:
+                aliases.setdefault(alias, canonical)
+        if public_root and public_root != "/":
+            aliases.setdefault(f"{public_root}/health", "/health")
+    return aliases
+
+
+def _first_segment(path: str) -> str:
+    return path[1:].partition("/")[0]
+
+
+class PrefixAliasMiddleware:
+    def __init__(self, app: ASGIApp, aliases: Dict[str, str]) -> None:
+        self.app = app
+        # Aliases are bucketed by their first path segment, so the lookup cost does not
+        # grow with the number of configured prefixes. Longer aliases are tried first.
+        self._aliases: Dict[str, List[Tuple[str, str]]] = {}
+        for alias, target in sorted(aliases.items(), key=lambda item: -len(item[0])):
+            self._aliases.setdefault(_first_segment(alias), []).append((alias, target))
+
+    def _rewrite(self, path: str) -> Tuple[str, str] | None:
+        for alias, target in self._aliases.get(_first_segment(path), ()):
+            if path == alias or path.startswith(alias) and path[len(alias)] == "/":
+                return (alias, target) if alias != target else None
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        root_path = scope.get("root_path", "")
+        path = scope["path"]
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        match = self._rewrite(path)
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        alias, target = match
+        rewritten = f"{target}{path[len(alias):]}" or "/"
+        scope = dict(scope, path=f"{root_path}{rewritten}")
+        raw_path = scope.get("raw_path")
+        raw_alias = f"{root_path}{alias}".encode()
+        if raw_path is not None and raw_path.startswith(raw_alias):
+            raw_target = f"{root_path}{target}".encode()
+            scope["raw_path"] = raw_target + raw_path[len(raw_alias):] or b"/"
+        await self.app(scope, receive, send)
@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import List, Optional
+from datetime import date, datetime
+from typing import Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -31,6 +31,7 @@ class CategoryBase(BaseModel):
 
 class CategoryRead(CategoryBase):
     id: int
+    image_variants: Optional[Dict[str, str]] = None
 
     class Config:
         from_attributes = True
@@ -46,11 +47,16 @@ class ProductBase(BaseModel):
 
 class ProductRead(ProductBase):
     id: int
+    image_variants: Optional[Dict[str, str]] = None
 
     class Config:
         from_attributes = True
 
 
+class CatalogCategoryRead(CategoryRead):
+    products: List[ProductRead]
+
+
 class OrderItemCreate(BaseModel):
     product_id: int
     quantity: int
@@ -104,5 +110,84 @@ class AdminPhoneNumberRead(BaseModel):
         from_attributes = True
 
 
+class AdminPhoneNumberBulkCreate(BaseModel):
+    phone_numbers: List[str] = Field(max_length=1000)
+
+
+class AdminPhoneNumberBulkResult(BaseModel):
+    created: List[AdminPhoneNumberRead]
+    skipped: List[str]
+
+
+OrderStatus = Literal["pending", "completed"]
+
+
 class OrderStatusUpdate(BaseModel):
     status: str
+
+
+class SalesBreakdownRead(BaseModel):
+    day: Optional[date] = None
+    category_id: Optional[int] = None
+    category_name: Optional[str] = None
+    product_id: Optional[int] = None
+    product_name: Optional[str] = None
+    order_count: Optional[int] = None
+    quantity: Optional[int] = None
+    revenue: float
+
+
+class TelegramSessionCreate(BaseModel):
+    init_data: str
+
+
+class TelegramSessionRead(BaseModel):
+    token: str
+    expires_at: datetime
+    telegram_id: int
+    is_admin: bool
+
+
+class DatabasePoolRead(BaseModel):
+    pool_class: str
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    max_overflow: int
+    checkouts: int
+    checkout_timeouts: int
+    wait_seconds_avg: float
+    wait_seconds_max: float
+
+
+class RouteQueryStatsRead(BaseModel):
+    route: str
+    requests: int
+    queries: int
+    queries_per_request: float
+    max_queries: int
+    avg_seconds: float
+
+
+class DatabaseStatsRead(BaseModel):
+    pool: DatabasePoolRead
+    read_pool: DatabasePoolRead | None = None
+    routes: List[RouteQueryStatsRead]
+
+
+class MediaUploadCreate(BaseModel):
+    kind: Literal["products", "categories"]
+    filename: str = Field(..., max_length=255)
+    content_type: str = Field(..., pattern=r"^image/[\w.+-]+$")
+    size: int = Field(..., gt=0)
+    sha256: str = Field(..., pattern=r"^[0-9a-f]{64}$")
+
+
+class MediaUploadRead(BaseModel):
+    key: str
+    media_url: str
+    exists: bool
+    upload_url: Optional[str] = None
+    method: Optional[str] = None
+    headers: Dict[str, str] = Field(default_factory=dict)
@@ -0,0 +1,17 @@
+import uvicorn
+
+from .config import get_settings
+
+
+def main() -> None:
+    settings = get_settings()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.server_host,
+        port=settings.server_port,
+        workers=settings.web_concurrency,
+    )
+
+
+if __name__ == "__main__":
+    main()
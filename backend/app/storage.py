@@ -0,0 +1,396 @@
+import base64
+import hashlib
+import mimetypes
+import os
+import posixpath
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, Tuple
+from uuid import uuid4
+
+from .config import get_settings
+from .media import MEDIA_CACHE_CONTROL, write_precompressed
+
+try:  # pragma: no cover - boto3 optional at runtime
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - only the filesystem backend is available
+    boto3 = None
+
+
+settings = get_settings()
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_TEMP_SUFFIX = ".part"
+S3_DELETE_BATCH_SIZE = 1000
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    url: str
+    key: str
+    sha256: str
+    size: int
+
+
+@dataclass(frozen=True)
+class PresignedUpload:
+    url: str
+    method: str = "PUT"
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def media_key(subdir: str, filename: str) -> str:
+    return "/".join(part for part in (subdir.strip("/"), filename) if part)
+
+
+def is_safe_key(key: str) -> bool:
+    parts = key.split("/")
+    return bool(key) and not key.startswith("/") and ".." not in parts and "" not in parts
+
+
+def _copy_hashed(source: BinaryIO, target: BinaryIO | None, max_bytes: int) -> Tuple[str, int]:
+    digest = hashlib.sha256()
+    total = 0
+    source.seek(0)
+    while True:
+        chunk = source.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if max_bytes and total > max_bytes:
+            raise UploadTooLarge()
+        digest.update(chunk)
+        if target is not None:
+            target.write(chunk)
+    source.seek(0)
+    return digest.hexdigest(), total
+
+
+class MediaStorage(ABC):
+    # Keys look like ``products/<sha256>.jpg``. Every method blocks, so async
+    # callers run them through ``run_in_threadpool``.
+    @abstractmethod
+    def public_base(self) -> str:
+        raise NotImplementedError
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_base()}/{key}"
+
+    def key_for_url(self, url: str | None) -> str | None:
+        if not url:
+            return None
+        prefix = f"{self.public_base()}/"
+        if not url.startswith(prefix):
+            return None
+        key = url[len(prefix):]
+        return key if is_safe_key(key) else None
+
+    @abstractmethod
+    def save(self, source: BinaryIO, subdir: str, extension: str, max_bytes: int) -> StoredUpload:
+        raise NotImplementedError
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def touch(self, key: str) -> bool:
+        # Refreshes the modification time of a stored object that is being reused, so the
+        # media GC grace period starts over. Returns False when the object does not exist.
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_objects(self) -> Iterator[Tuple[str, float]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, keys: Iterable[str], modified_before: float | None = None) -> int:
+        # With ``modified_before`` each object is re-checked right before it is removed, so a
+        # dedup upload that touched it after the caller listed it keeps it alive.
+        raise NotImplementedError
+
+    @abstractmethod
+    def fetch_local(self, key: str) -> Path:
+        raise NotImplementedError
+
+    @abstractmethod
+    def finish_local(self, key: str, source: Path, derived: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def presign_upload(
+        self, key: str, content_type: str, size: int, sha256: str
+    ) -> PresignedUpload | None:
+        # Returns None when the backend cannot take uploads straight from the client.
+        raise NotImplementedError
+
+
+class FilesystemStorage(MediaStorage):
+    def __init__(self, root: str) -> None:
+        self.root = Path(root)
+
+    def public_base(self) -> str:
+        base = (settings.media_url or "").rstrip("/")
+        if settings.media_base_url:
+            return f"{settings.media_base_url}{base}"
+        return base
+
+    def key_for_url(self, url: str | None) -> str | None:
+        # Rows written before MEDIA_BASE_URL was set still hold the bare media path.
+        if url and settings.media_base_url and not url.startswith(settings.media_base_url):
+            base = (settings.media_url or "").rstrip("/")
+            if url.startswith(f"{base}/"):
+                url = f"{settings.media_base_url}{url}"
+        return super().key_for_url(url)
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key
+
+    def save(self, source: BinaryIO, subdir: str, extension: str, max_bytes: int) -> StoredUpload:
+        directory = self.root / subdir.strip("/")
+        directory.mkdir(parents=True, exist_ok=True)
+        temp_path = directory / f".{uuid4().hex}{UPLOAD_TEMP_SUFFIX}"
+        try:
+            with temp_path.open("wb") as buffer:
+                sha256, size = _copy_hashed(source, buffer, max_bytes)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        key = media_key(subdir, f"{sha256}{extension}")
+        path = self.path_for(key)
+        if self.touch(key):
+            # Same content is already stored; the touch restarts the media GC grace period.
+            temp_path.unlink()
+        else:
+            os.replace(temp_path, path)
+            write_precompressed(path)
+        return StoredUpload(url=self.url_for(key), key=key, sha256=sha256, size=size)
+
+    def exists(self, key: str) -> bool:
+        return self.path_for(key).is_file()
+
+    def touch(self, key: str) -> bool:
+        try:
+            os.utime(self.path_for(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def list_objects(self) -> Iterator[Tuple[str, float]]:
+        for directory, _subdirs, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                try:
+                    modified = path.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                yield path.relative_to(self.root).as_posix(), modified
+
+    def delete(self, keys: Iterable[str], modified_before: float | None = None) -> int:
+        removed = 0
+        for key in keys:
+            path = self.path_for(key)
+            try:
+                if modified_before is not None and path.stat().st_mtime >= modified_before:
+                    continue
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+        return removed
+
+    def fetch_local(self, key: str) -> Path:
+        return self.path_for(key)
+
+    def finish_local(self, key: str, source: Path, derived: Iterable[str]) -> None:
+        # Variants are rendered next to the original, so there is nothing to publish.
+        return None
+
+    def presign_upload(
+        self, key: str, content_type: str, size: int, sha256: str
+    ) -> PresignedUpload | None:
+        # Files are only written by the API process, so uploads go through the multipart form.
+        return None
+
+
+class S3Storage(MediaStorage):
+    def __init__(self, bucket: str) -> None:
+        self.bucket = bucket
+        self.client = self._create_client(settings.s3_endpoint_url)
+        # SigV4 binds the host into the signature, so URLs handed to browsers are signed
+        # by a client that talks to the public endpoint rather than rewritten afterwards.
+        self.presign_client = self.client
+        if settings.s3_presign_endpoint_url:
+            self.presign_client = self._create_client(settings.s3_presign_endpoint_url)
+        chunk_size = settings.s3_multipart_chunk_mb * 1024 * 1024
+        self.transfer_config = TransferConfig(
+            multipart_threshold=chunk_size, multipart_chunksize=chunk_size
+        )
+
+    @staticmethod
+    def _create_client(endpoint_url: str | None):
+        return boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=settings.s3_region,
+            aws_access_key_id=settings.s3_access_key_id,
+            aws_secret_access_key=settings.s3_secret_access_key,
+            # SigV4 signs the checksum, length and type headers of presigned uploads;
+            # SigV2 would only sign the URL and let any body through.
+            config=Config(signature_version="s3v4"),
+        )
+
+    def public_base(self) -> str:
+        if settings.s3_public_base_url:
+            return settings.s3_public_base_url
+        endpoint = settings.s3_endpoint_url or f"https://s3.{settings.s3_region}.amazonaws.com"
+        return f"{endpoint.rstrip('/')}/{self.bucket}"
+
+    def _object_args(self, key: str) -> Dict[str, str]:
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        return {"ContentType": content_type, "CacheControl": MEDIA_CACHE_CONTROL}
+
+    def save(self, source: BinaryIO, subdir: str, extension: str, max_bytes: int) -> StoredUpload:
+        # The key is the content hash, so the body is hashed before it is sent.
+        sha256, size = _copy_hashed(source, None, max_bytes)
+        key = media_key(subdir, f"{sha256}{extension}")
+        if not self.touch(key):
+            self.client.upload_fileobj(
+                source,
+                self.bucket,
+                key,
+                ExtraArgs=self._object_args(key),
+                Config=self.transfer_config,
+            )
+        return StoredUpload(url=self.url_for(key), key=key, sha256=sha256, size=size)
+
+    def _modified_at(self, key: str) -> float | None:
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return response["LastModified"].timestamp()
+
+    def exists(self, key: str) -> bool:
+        return self._modified_at(key) is not None
+
+    def touch(self, key: str) -> bool:
+        # Copying the object onto itself bumps LastModified.
+        try:
+            self.client.copy_object(
+                Bucket=self.bucket,
+                Key=key,
+                CopySource={"Bucket": self.bucket, "Key": key},
+                MetadataDirective="REPLACE",
+                **self._object_args(key),
+            )
+        except ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def list_objects(self) -> Iterator[Tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket):
+            for item in page.get("Contents", ()):
+                yield item["Key"], item["LastModified"].timestamp()
+
+    def delete(self, keys: Iterable[str], modified_before: float | None = None) -> int:
+        keys = list(keys)
+        if modified_before is not None:
+            stale = []
+            for key in keys:
+                modified = self._modified_at(key)
+                if modified is not None and modified < modified_before:
+                    stale.append(key)
+            keys = stale
+        removed = 0
+        for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+            batch = keys[start:start + S3_DELETE_BATCH_SIZE]
+            response = self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+            removed += len(batch) - len(response.get("Errors", ()))
+        return removed
+
+    def fetch_local(self, key: str) -> Path:
+        directory = Path(tempfile.mkdtemp(prefix="media-"))
+        path = directory / posixpath.basename(key)
+        try:
+            self.client.download_file(self.bucket, key, str(path))
+        except BaseException:
+            shutil.rmtree(directory, ignore_errors=True)
+            raise
+        return path
+
+    def finish_local(self, key: str, source: Path, derived: Iterable[str]) -> None:
+        try:
+            prefix = posixpath.dirname(key)
+            for filename in derived:
+                derived_key = media_key(prefix, filename)
+                self.client.upload_file(
+                    str(source.parent / filename),
+                    self.bucket,
+                    derived_key,
+                    ExtraArgs=self._object_args(derived_key),
+                    Config=self.transfer_config,
+                )
+        finally:
+            shutil.rmtree(source.parent, ignore_errors=True)
+
+    def presign_upload(
+        self, key: str, content_type: str, size: int, sha256: str
+    ) -> PresignedUpload:
+        # The URL signs cache-control, content-length, content-type, host and
+        # x-amz-checksum-sha256, so S3 rejects a body that does not match the declared
+        # hash. That keeps the content-addressed key honest without the API seeing the bytes.
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+        url = self.presign_client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+                "CacheControl": MEDIA_CACHE_CONTROL,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=settings.s3_presign_expires_seconds,
+        )
+        return PresignedUpload(
+            url=url,
+            headers={
+                "Content-Type": content_type,
+                "Cache-Control": MEDIA_CACHE_CONTROL,
+                "x-amz-checksum-sha256": checksum,
+            },
+        )
+
+
+def _create_storage() -> MediaStorage:
+    if settings.media_storage == "s3":
+        if boto3 is None:
+            raise RuntimeError("boto3 is required for MEDIA_STORAGE=s3")
+        if not settings.s3_bucket:
+            raise RuntimeError("S3_BUCKET is required for MEDIA_STORAGE=s3")
+        return S3Storage(settings.s3_bucket)
+    return FilesystemStorage(settings.media_root)
+
+
+media_storage = _create_storage()
+
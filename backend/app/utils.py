@@ -1,17 +1,33 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Collection, FrozenSet
+import asyncio
+import hashlib
+import logging
 import re
-from uuid import uuid4
 
-from fastapi import HTTPException, UploadFile, status
-from sqlalchemy import select
+from fastapi import HTTPException, Response, UploadFile, status
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+from sqlalchemy import ColumnElement, exists, or_, select, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from .auth import claims_from_authorization
 from .config import get_settings
-from .models import AdminPhoneNumber, User
+from .models import AdminPhoneNumber, AppState, User
+from .notifications import ADMIN_CACHE_KEY, CACHE_INVALIDATION_CHANNEL, notify
+from .storage import StoredUpload, UploadTooLarge, is_safe_key, media_storage
 
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
+CATALOG_CACHE_CONTROL = "public, no-cache"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
 
 def normalize_phone(value: str | None) -> str | None:
     if value is None:
@@ -20,105 +36,300 @@ def normalize_phone(value: str | None) -> str | None:
     return digits or None
 
 
-async def _has_any_admin(session: AsyncSession) -> bool:
-    if settings.admin_telegram_ids or settings.admin_phone_numbers:
-        return True
-    result = await session.execute(select(AdminPhoneNumber.id).limit(1))
-    return result.scalar_one_or_none() is not None
+def naive_utc(value: datetime | None) -> datetime | None:
+    # Timestamps are stored as naive UTC; aware query values must match that before comparison.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
 
 
-async def is_admin_user(
-    session: AsyncSession, telegram_id: int | None, phone_number: str | None = None
-) -> bool:
-    admin_ids = {int(x) for x in settings.admin_telegram_ids}
-    admin_phones = {phone for phone in settings.admin_phone_numbers}
+def make_etag(*parts: object) -> str:
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
 
-    normalized_phone = normalize_phone(phone_number)
 
-    if admin_ids and telegram_id and telegram_id in admin_ids:
-        return True
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
 
-    if admin_phones and normalized_phone and normalized_phone in admin_phones:
-        return True
 
-    if normalized_phone:
-        result = await session.execute(
-            select(AdminPhoneNumber).where(AdminPhoneNumber.phone_number == normalized_phone)
+def conditional_response(
+    response: Response, etag: str, if_none_match: str | None, cache_control: str
+) -> Response | None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": cache_control},
         )
-        if result.scalar_one_or_none() is not None:
+    return None
+
+
+@dataclass(frozen=True)
+class AdminDirectory:
+    telegram_ids: FrozenSet[int]
+    phone_numbers: FrozenSet[str]
+
+    @property
+    def has_any(self) -> bool:
+        return bool(self.telegram_ids or self.phone_numbers)
+
+    def contains(self, telegram_id: int | None, phone_number: str | None) -> bool:
+        if telegram_id and telegram_id in self.telegram_ids:
             return True
+        normalized_phone = normalize_phone(phone_number)
+        return bool(normalized_phone and normalized_phone in self.phone_numbers)
 
-    return False
 
+class AdminDirectoryCache:
+    def __init__(self) -> None:
+        self._directory: AdminDirectory | None = None
+        self._version = 0
+        self._lock = asyncio.Lock()
 
-async def ensure_admin(
+    async def get(self, session: AsyncSession) -> AdminDirectory:
+        directory = self._directory
+        if directory is not None:
+            return directory
+        async with self._lock:
+            if self._directory is not None:
+                return self._directory
+            version = self._version
+            directory = await _load_admin_directory(session)
+            if version == self._version:
+                self._directory = directory
+            return directory
+
+    def invalidate(self) -> None:
+        self._version += 1
+        self._directory = None
+
+    async def notify_changed(self, session: AsyncSession) -> None:
+        # Sent inside the mutating transaction: the admin change and the invalidation of
+        # every other worker's cache commit together or not at all.
+        await notify(session, CACHE_INVALIDATION_CHANNEL, ADMIN_CACHE_KEY)
+
+    async def refresh(self, session: AsyncSession) -> None:
+        # Rebuilds this worker's directory after the change committed. The cache is already
+        # invalidated, so a failed rebuild only means the next lookup reloads it.
+        async with self._lock:
+            self.invalidate()
+            version = self._version
+            try:
+                directory = await _load_admin_directory(session)
+            except Exception:  # pragma: no cover - next read reloads lazily
+                logger.exception("Failed to rebuild admin directory")
+                return
+            if version == self._version:
+                self._directory = directory
+
+
+async def _load_admin_directory(session: AsyncSession) -> AdminDirectory:
+    result = await session.execute(select(AdminPhoneNumber.phone_number))
+    return AdminDirectory(
+        telegram_ids=frozenset(int(x) for x in settings.admin_telegram_ids),
+        phone_numbers=frozenset(settings.admin_phone_numbers) | frozenset(result.scalars()),
+    )
+
+
+admin_directory = AdminDirectoryCache()
+
+
+async def is_admin_user(
     session: AsyncSession, telegram_id: int | None, phone_number: str | None = None
+) -> bool:
+    directory = await admin_directory.get(session)
+    return directory.contains(telegram_id, phone_number)
+
+
+async def is_session_user_admin(session: AsyncSession, telegram_id: int) -> bool:
+    result = await session.execute(
+        select(User.phone_number, User.is_admin).where(User.telegram_id == telegram_id)
+    )
+    user = result.one_or_none()
+    directory = await admin_directory.get(session)
+    return directory.contains(telegram_id, user.phone_number if user else None) or bool(
+        user and user.is_admin
+    )
+
+
+async def ensure_admin(
+    session: AsyncSession,
+    telegram_id: int | None,
+    phone_number: str | None = None,
+    authorization: str | None = None,
 ) -> None:
-    if await is_admin_user(session, telegram_id, phone_number):
+    claims = claims_from_authorization(authorization)
+    if claims is not None:
+        if claims.is_admin:
+            return
+        # The claim was fixed when the token was issued; the user may have been made
+        # admin since, so a negative claim is checked against the current directory.
+        if await is_session_user_admin(session, claims.telegram_id):
+            return
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+
+    if not settings.admin_header_auth_enabled:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session token required")
+
+    directory = await admin_directory.get(session)
+    if directory.contains(telegram_id, phone_number):
         return
 
-    if not await _has_any_admin(session):
+    if not directory.has_any:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access not configured")
 
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
 
 
-async def sync_user_admin_status(session: AsyncSession, user: User) -> None:
-    is_admin = await is_admin_user(session, user.telegram_id, user.phone_number)
-    user.is_admin = is_admin
+def admin_flag_for(telegram_id: int, normalized_phone: str) -> ColumnElement[bool]:
+    if telegram_id in {int(x) for x in settings.admin_telegram_ids}:
+        return true()
+    if normalized_phone in settings.admin_phone_numbers:
+        return true()
+    return (
+        select(AdminPhoneNumber.id)
+        .where(AdminPhoneNumber.phone_number == normalized_phone)
+        .exists()
+        .select()
+        .scalar_subquery()
+    )
 
 
-def save_upload_file(upload_file: UploadFile, subdir: str) -> str:
-    media_root = Path(settings.media_root)
-    media_root.mkdir(parents=True, exist_ok=True)
-    target_dir = media_root / subdir
-    target_dir.mkdir(parents=True, exist_ok=True)
+def _admin_flag_expression():
+    conditions = [
+        exists(
+            select(AdminPhoneNumber.id).where(
+                AdminPhoneNumber.phone_number == User.phone_number_normalized
+            )
+        )
+    ]
+    if settings.admin_telegram_ids:
+        conditions.append(User.telegram_id.in_([int(x) for x in settings.admin_telegram_ids]))
+    if settings.admin_phone_numbers:
+        conditions.append(User.phone_number_normalized.in_(settings.admin_phone_numbers))
+    return or_(*conditions)
+
+
+async def resync_admin_flags(
+    session: AsyncSession, phone_numbers: Collection[str] | None = None
+) -> None:
+    flag = _admin_flag_expression()
+    stmt = update(User).where(User.is_admin.is_distinct_from(flag)).values(is_admin=flag)
+    if phone_numbers is not None:
+        if not phone_numbers:
+            return
+        stmt = stmt.where(User.phone_number_normalized.in_(list(phone_numbers)))
+    await session.execute(stmt.execution_options(synchronize_session=False))
+
+
+ADMIN_SETTINGS_STATE_KEY = "admin_settings"
+
+
+def admin_settings_fingerprint() -> str:
+    telegram_ids = sorted({int(x) for x in settings.admin_telegram_ids})
+    phone_numbers = sorted(set(settings.admin_phone_numbers))
+    payload = f"{telegram_ids}|{phone_numbers}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def sync_admin_settings(session: AsyncSession) -> bool:
+    # Flags only depend on the environment admin lists between admin phone edits, so the
+    # full users scan runs only when ADMIN_TELEGRAM_IDS or ADMIN_PHONE_NUMBERS changed.
+    fingerprint = admin_settings_fingerprint()
+    stored = await session.scalar(
+        select(AppState.value).where(AppState.key == ADMIN_SETTINGS_STATE_KEY)
+    )
+    if stored == fingerprint:
+        return False
+    await resync_admin_flags(session)
+    await session.merge(AppState(key=ADMIN_SETTINGS_STATE_KEY, value=fingerprint))
+    return True
+
+
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+
+def max_upload_bytes() -> int:
+    return int(settings.max_upload_size_mb * 1024 * 1024)
+
+
+def upload_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Fayl hajmi {settings.max_upload_size_mb:g} MB dan oshmasligi kerak",
+    )
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and _declares_oversized_upload(scope):
+            error = upload_too_large()
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def _declares_oversized_upload(scope: Scope) -> bool:
+    headers = Headers(scope=scope)
+    if not headers.get("content-type", "").startswith("multipart/form-data"):
+        return False
+    try:
+        declared = int(headers.get("content-length", ""))
+    except ValueError:
+        return False
+    return declared > max_upload_bytes() + UPLOAD_FORM_OVERHEAD
+
+
+async def save_upload_file(upload_file: UploadFile, subdir: str) -> StoredUpload:
+    if upload_file.size is not None and upload_file.size > max_upload_bytes():
+        raise upload_too_large()
 
     original_name = upload_file.filename or "uploaded_file"
     extension = Path(original_name).suffix.lower()
-    safe_name = f"{uuid4().hex}{extension}"
-    path = target_dir / safe_name
-
-    max_bytes = int(settings.max_upload_size_mb * 1024 * 1024)
-    total_written = 0
 
-    upload_file.file.seek(0)
+    # Copying, hashing and any network transfer block, so they run on a worker thread.
     try:
-        with path.open("wb") as buffer:
-            while True:
-                chunk = upload_file.file.read(1024 * 1024)
-                if not chunk:
-                    break
-                total_written += len(chunk)
-                if max_bytes and total_written > max_bytes:
-                    buffer.close()
-                    path.unlink(missing_ok=True)
-                    raise HTTPException(
-                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-                        detail=f"Fayl hajmi {settings.max_upload_size_mb:g} MB dan oshmasligi kerak",
-                    )
-                buffer.write(chunk)
-    finally:
-        try:
-            upload_file.file.seek(0)
-        except Exception:  # pragma: no cover - best effort reset
-            pass
-
-    relative_path = _build_media_path(subdir, safe_name)
-    if settings.media_base_url:
-        base = settings.media_base_url.rstrip("/")
-        if relative_path.startswith("/"):
-            return f"{base}{relative_path}"
-        return f"{base}/{relative_path}"
-    return relative_path
-
-
-def _build_media_path(subdir: str, filename: str) -> str:
-    base = (settings.media_url or "").strip()
-    base = base.rstrip("/")
-    normalized_subdir = subdir.strip("/")
-    parts = [part for part in [base, normalized_subdir, filename] if part]
-    path = "/".join(parts)
-    if not path.startswith("/"):
-        path = f"/{path}"
-    return path
+        return await run_in_threadpool(
+            media_storage.save, upload_file.file, subdir, extension, max_upload_bytes()
+        )
+    except UploadTooLarge:
+        raise upload_too_large() from None
+
+
+async def _resolve_image_key(image_key: str, subdir: str) -> str:
+    # Keys come from POST /media/uploads; only accept objects that landed in the expected folder.
+    prefix = f"{subdir.strip('/')}/"
+    if (
+        not is_safe_key(image_key)
+        or not image_key.startswith(prefix)
+        or "/" in image_key[len(prefix):]
+        or not await run_in_threadpool(media_storage.touch, image_key)
+    ):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded image not found")
+    return media_storage.url_for(image_key)
+
+
+async def store_image(
+    image: UploadFile | None, image_key: str | None, subdir: str
+) -> str | None:
+    if image:
+        stored = await save_upload_file(image, subdir)
+        return stored.url
+    if image_key:
+        return await _resolve_image_key(image_key.strip(), subdir)
+    return None
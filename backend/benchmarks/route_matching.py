@@ -0,0 +1,137 @@
+"""Compare per-request routing cost of duplicated prefixes and the alias layer.
+
+Run from ``backend/``::
+
+    python -m benchmarks.route_matching --aliases 0 2 4 8 16
+"""
+import argparse
+import asyncio
+import time
+from typing import Callable, List, Sequence
+
+from fastapi import FastAPI
+from starlette.routing import Match
+from starlette.types import Receive, Scope, Send
+
+from app.main import API_ROUTERS, health_check
+from app.routing import PrefixAliasMiddleware, build_prefix_aliases, combine_prefix
+
+API_PREFIX = "/api"
+PUBLIC_ROOT = "/api-backend"
+
+
+def _alias_prefixes(count: int) -> List[str]:
+    return [f"/v{index}" for index in range(1, count + 1)]
+
+
+def build_duplicated_app(aliases: Sequence[str]) -> FastAPI:
+    # The previous layout: every router included once per public prefix.
+    app = FastAPI()
+    prefixes = [API_PREFIX, *aliases]
+    for public_root in ("", PUBLIC_ROOT):
+        for prefix in prefixes:
+            for router in API_ROUTERS:
+                app.include_router(router, prefix=combine_prefix(public_root, prefix))
+    app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_api_route(f"{PUBLIC_ROOT}/health", health_check, methods=["GET"])
+    return app
+
+
+def build_aliased_app(aliases: Sequence[str]) -> FastAPI:
+    app = FastAPI()
+    for router in API_ROUTERS:
+        app.include_router(router, prefix=API_PREFIX)
+    app.add_api_route("/health", health_check, methods=["GET"])
+    app.add_middleware(
+        PrefixAliasMiddleware,
+        aliases=build_prefix_aliases(API_PREFIX, aliases, [PUBLIC_ROOT]),
+    )
+    return app
+
+
+def _scope(path: str) -> Scope:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+
+async def _receive() -> dict:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(_message: dict) -> None:
+    return None
+
+
+def _route_matcher(app: FastAPI):
+    routes = app.router.routes
+
+    async def match(scope: Scope, _receive: Receive, _send: Send) -> None:
+        for route in routes:
+            matched, _child = route.matches(scope)
+            if matched is Match.FULL:
+                return
+        raise LookupError(scope["path"])
+
+    return match
+
+
+async def _time_calls(call: Callable, path: str, iterations: int) -> float:
+    for _ in range(min(iterations, 1000)):
+        await call(_scope(path), _receive, _send)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await call(_scope(path), _receive, _send)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+async def run(alias_counts: Sequence[int], iterations: int) -> None:
+    print(
+        f"{'aliases':>7} {'case':<24} {'dup routes':>10} {'dup us':>8} "
+        f"{'alias routes':>12} {'alias us':>8}"
+    )
+    for count in alias_counts:
+        aliases = _alias_prefixes(count)
+        duplicated = build_duplicated_app(aliases)
+        aliased = build_aliased_app(aliases)
+        last_prefix = combine_prefix(PUBLIC_ROOT, aliases[-1] if aliases else API_PREFIX)
+
+        # Route matching alone, for an aliased API route near the end of the table.
+        match_path = f"{last_prefix}/analytics/sales"
+        alias_matcher = PrefixAliasMiddleware(
+            _route_matcher(aliased), build_prefix_aliases(API_PREFIX, aliases, [PUBLIC_ROOT])
+        )
+        cases = [
+            ("match aliased API route", _route_matcher(duplicated), alias_matcher, match_path),
+            ("GET /health, full stack", duplicated, aliased, "/health"),
+        ]
+        for name, duplicated_call, aliased_call, path in cases:
+            duplicated_us = await _time_calls(duplicated_call, path, iterations)
+            aliased_us = await _time_calls(aliased_call, path, iterations)
+            print(
+                f"{count:>7} {name:<24} {len(duplicated.router.routes):>10} "
+                f"{duplicated_us:>8.1f} {len(aliased.router.routes):>12} {aliased_us:>8.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--aliases", type=int, nargs="+", default=[0, 2, 4, 8, 16])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    asyncio.run(run(args.aliases, args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,13 @@
-import { useCallback, useEffect, useMemo, useState } from "react";
-import { fetchCategories, fetchProducts, fetchUserOrders, fetchAllOrders } from "./api/client";
+import { useCallback, useEffect, useMemo, useRef, useState } from "react";
+import {
+  createSession,
+  fetchCatalog,
+  fetchUserOrders,
+  fetchOrdersPage,
+  subscribeToAllOrderEvents,
+  setSessionToken,
+  subscribeToUserOrderEvents,
+} from "./api/client";
 import { AdminPanel } from "./components/AdminPanel";
 import { CartPage } from "./components/CartPage";
 import { CategoryTabs } from "./components/CategoryTabs";
@@ -10,11 +18,25 @@ import { useCart } from "./context/CartContext";
 import { useTelegram } from "./hooks/useTelegram";
 import type { Category, Order, Product, User } from "./types";
 
+const isOlderOrder = (order: Order, than: Order) => {
+  const created = new Date(order.created_at).getTime();
+  const reference = new Date(than.created_at).getTime();
+  return created < reference || (created === reference && order.id < than.id);
+};
+
+const mergeNewestOrders = (newest: Order[], loaded: Order[]) => {
+  const last = newest[newest.length - 1];
+  if (!last) {
+    return loaded;
+  }
+  const fresh = new Set(newest.map((order) => order.id));
+  return [...newest, ...loaded.filter((order) => !fresh.has(order.id) && isOlderOrder(order, last))];
+};
+
 const App: React.FC = () => {
-  const { user: tgUser } = useTelegram();
+  const { user: tgUser, WebApp } = useTelegram();
   const [user, setUser] = useState<User | null>(null);
   const [categories, setCategories] = useState<Category[]>([]);
-  const [products, setProducts] = useState<Product[]>([]);
   const [allProducts, setAllProducts] = useState<Product[]>([]);
   const [orders, setOrders] = useState<Order[]>([]);
   const [selectedCategory, setSelectedCategory] = useState<Category | null>(null);
@@ -22,6 +44,12 @@ const App: React.FC = () => {
   const [error, setError] = useState<string | null>(null);
   const [ordersLoading, setOrdersLoading] = useState(false);
   const [ordersError, setOrdersError] = useState<string | null>(null);
+  const [ordersCursor, setOrdersCursor] = useState<string | null>(null);
+  const [ordersLoadingMore, setOrdersLoadingMore] = useState(false);
+  const olderOrdersLoadedRef = useRef(false);
+  const reopenSessionRef = useRef<(() => Promise<void>) | null>(null);
+  const [orderEventsKey, setOrderEventsKey] = useState(0);
+  const orderEventsRenewedRef = useRef(false);
   const { state } = useCart();
   const [activeTab, setActiveTab] = useState<"home" | "cart" | "profile" | "admin">("home");
   const [cartView, setCartView] = useState<"cart" | "history">("cart");
@@ -70,21 +98,47 @@ const App: React.FC = () => {
 
   const isAdmin = Boolean(user?.is_admin || adminTelegramId !== null || adminPhoneNumber !== null);
 
-  const loadCategories = useCallback(async () => {
-    try {
-      const list = await fetchCategories();
-      setCategories(list);
-    } catch (err) {
-      console.error(err);
-      setError("Kategoriyalarni yuklab bo'lmadi");
-    }
-  }, []);
+  useEffect(() => {
+    const initData = WebApp.initData;
+    if (!initData) return undefined;
+
+    let renewTimer: ReturnType<typeof setTimeout> | undefined;
+    const openSession = async () => {
+      if (renewTimer) clearTimeout(renewTimer);
+      try {
+        const session = await createSession(initData);
+        setSessionToken(session.token);
+        const lifetimeMs = new Date(`${session.expires_at}Z`).getTime() - Date.now();
+        renewTimer = setTimeout(openSession, Math.max(lifetimeMs * 0.8, 60_000));
+      } catch (err) {
+        console.error(err);
+      }
+    };
+    reopenSessionRef.current = openSession;
+    void openSession();
+
+    return () => {
+      if (renewTimer) clearTimeout(renewTimer);
+      reopenSessionRef.current = null;
+      setSessionToken(null);
+    };
+  }, [WebApp]);
+
+  const sessionUserId = user?.id;
+  const sessionUserIsAdmin = user?.is_admin;
+  useEffect(() => {
+    // The token carries the admin flag from when it was issued, so a fresh one is taken
+    // once the profile is saved or the user's admin status changes.
+    if (sessionUserId === undefined) return;
+    void reopenSessionRef.current?.();
+  }, [sessionUserId, sessionUserIsAdmin]);
 
-  const loadProducts = useCallback(async (category?: Category | null) => {
+  const loadCatalog = useCallback(async () => {
     try {
       setLoading(true);
-      const list = await fetchProducts(category?.id ?? undefined);
-      setProducts(list);
+      const catalog = await fetchCatalog();
+      setCategories(catalog.map(({ products: _products, ...category }) => category));
+      setAllProducts(catalog.flatMap((category) => category.products));
     } catch (err) {
       console.error(err);
       setError("Mahsulotlar yuklanmadi");
@@ -93,27 +147,35 @@ const App: React.FC = () => {
     }
   }, []);
 
-  const refreshAllProducts = useCallback(async () => {
-    try {
-      const list = await fetchProducts();
-      setAllProducts(list);
-    } catch (err) {
-      console.error(err);
-    }
-  }, []);
+  const products = useMemo(
+    () =>
+      selectedCategory
+        ? allProducts.filter((product) => product.category_id === selectedCategory.id)
+        : allProducts,
+    [allProducts, selectedCategory],
+  );
 
   const loadOrders = useCallback(async () => {
     if (isAdmin) {
       if (!adminTelegramId && !adminPhoneNumber) {
+        olderOrdersLoadedRef.current = false;
         setOrders([]);
+        setOrdersCursor(null);
         setOrdersError(null);
         return;
       }
       try {
         setOrdersLoading(true);
         setOrdersError(null);
-        const list = await fetchAllOrders(adminTelegramId, adminPhoneNumber);
-        setOrders(list);
+        const page = await fetchOrdersPage({}, adminTelegramId, adminPhoneNumber);
+        if (olderOrdersLoadedRef.current && page.nextCursor) {
+          // Refresh the newest page but keep the older pages the admin already loaded.
+          setOrders((prev) => mergeNewestOrders(page.orders, prev));
+        } else {
+          olderOrdersLoadedRef.current = false;
+          setOrders(page.orders);
+          setOrdersCursor(page.nextCursor);
+        }
       } catch (err) {
         console.error(err);
         setOrdersError("Buyurtma tarixini yuklab bo'lmadi");
@@ -128,7 +190,9 @@ const App: React.FC = () => {
         setOrdersLoading(true);
         setOrdersError(null);
         const list = await fetchUserOrders(user.id);
+        olderOrdersLoadedRef.current = false;
         setOrders(list);
+        setOrdersCursor(null);
       } catch (err) {
         console.error(err);
         setOrdersError("Buyurtma tarixini yuklab bo'lmadi");
@@ -138,26 +202,69 @@ const App: React.FC = () => {
       return;
     }
 
+    olderOrdersLoadedRef.current = false;
     setOrders([]);
+    setOrdersCursor(null);
     setOrdersError(null);
   }, [adminPhoneNumber, adminTelegramId, isAdmin, user]);
 
-  useEffect(() => {
-    void loadCategories();
-  }, [loadCategories]);
-
-  useEffect(() => {
-    void loadProducts(selectedCategory);
-  }, [loadProducts, selectedCategory]);
+  const loadMoreOrders = useCallback(async () => {
+    if (!isAdmin || !ordersCursor || ordersLoadingMore) {
+      return;
+    }
+    try {
+      setOrdersLoadingMore(true);
+      const page = await fetchOrdersPage({ cursor: ordersCursor }, adminTelegramId, adminPhoneNumber);
+      olderOrdersLoadedRef.current = true;
+      setOrders((prev) => {
+        const known = new Set(prev.map((order) => order.id));
+        return [...prev, ...page.orders.filter((order) => !known.has(order.id))];
+      });
+      setOrdersCursor(page.nextCursor);
+    } catch (err) {
+      console.error(err);
+      setOrdersError("Buyurtma tarixini yuklab bo'lmadi");
+    } finally {
+      setOrdersLoadingMore(false);
+    }
+  }, [adminPhoneNumber, adminTelegramId, isAdmin, ordersCursor, ordersLoadingMore]);
 
   useEffect(() => {
-    void refreshAllProducts();
-  }, [refreshAllProducts]);
+    void loadCatalog();
+  }, [loadCatalog]);
 
   useEffect(() => {
     void loadOrders();
   }, [loadOrders]);
 
+  useEffect(() => {
+    const handleOrderEvent = () => {
+      orderEventsRenewedRef.current = false;
+      void loadOrders();
+    };
+    // A rejected stream gets one fresh session and a new subscription; if that is
+    // rejected too, the error is shown instead of retrying forever.
+    const handleDenied = () => {
+      if (orderEventsRenewedRef.current) {
+        setOrdersError("Buyurtma yangilanishlarini kuzatib bo'lmadi");
+        return;
+      }
+      orderEventsRenewedRef.current = true;
+      void (async () => {
+        await reopenSessionRef.current?.();
+        setOrderEventsKey((key) => key + 1);
+      })();
+    };
+    if (isAdmin) {
+      if (!adminTelegramId && !adminPhoneNumber) return undefined;
+      return subscribeToAllOrderEvents(handleOrderEvent, adminTelegramId, adminPhoneNumber, handleDenied);
+    }
+    if (user) {
+      return subscribeToUserOrderEvents(user.id, handleOrderEvent, handleDenied);
+    }
+    return undefined;
+  }, [adminPhoneNumber, adminTelegramId, isAdmin, loadOrders, orderEventsKey, user]);
+
   const handleCategorySelect = (category: Category | null) => {
     setSelectedCategory(category);
   };
@@ -201,18 +308,16 @@ const App: React.FC = () => {
         return [...prev, category];
       });
       setSelectedCategory((prev) => prev ?? category);
-      void loadCategories();
-      void refreshAllProducts();
+      void loadCatalog();
     },
-    [loadCategories, refreshAllProducts],
+    [loadCatalog],
   );
 
   const handleProductCreated = useCallback(
     (_product: Product) => {
-      void loadProducts(selectedCategory);
-      void refreshAllProducts();
+      void loadCatalog();
     },
-    [loadProducts, refreshAllProducts, selectedCategory],
+    [loadCatalog],
   );
 
   const handleCategoryUpdated = useCallback(
@@ -222,47 +327,36 @@ const App: React.FC = () => {
       );
       if (selectedCategory?.id === category.id) {
         setSelectedCategory(category);
-        void loadProducts(category);
-      } else {
-        void loadProducts(selectedCategory);
       }
-      void loadCategories();
-      void refreshAllProducts();
+      void loadCatalog();
     },
-    [loadCategories, loadProducts, refreshAllProducts, selectedCategory],
+    [loadCatalog, selectedCategory],
   );
 
   const handleCategoryDeleted = useCallback(
     (categoryId: number) => {
       setCategories((prev) => prev.filter((item) => item.id !== categoryId));
-      const wasActive = selectedCategory?.id === categoryId;
-      if (wasActive) {
+      if (selectedCategory?.id === categoryId) {
         setSelectedCategory(null);
-        void loadProducts(null);
-      } else {
-        void loadProducts(selectedCategory);
       }
-      void loadCategories();
-      void refreshAllProducts();
+      void loadCatalog();
     },
-    [loadCategories, loadProducts, refreshAllProducts, selectedCategory],
+    [loadCatalog, selectedCategory],
   );
 
   const handleProductUpdated = useCallback(
     (_product: Product) => {
-      void loadProducts(selectedCategory);
-      void refreshAllProducts();
+      void loadCatalog();
     },
-    [loadProducts, refreshAllProducts, selectedCategory],
+    [loadCatalog],
   );
 
   const handleProductDeleted = useCallback(
     (productId: number) => {
-      setProducts((prev) => prev.filter((item) => item.id !== productId));
-      void refreshAllProducts();
-      void loadProducts(selectedCategory);
+      setAllProducts((prev) => prev.filter((item) => item.id !== productId));
+      void loadCatalog();
     },
-    [loadProducts, refreshAllProducts, selectedCategory],
+    [loadCatalog],
   );
 
   const adminNavColumns = isAdmin ? "grid-cols-4" : "grid-cols-3";
@@ -402,6 +496,16 @@ const App: React.FC = () => {
                         })}
                       </ul>
                     )}
+                    {!ordersLoading && !ordersError && ordersCursor ? (
+                      <button
+                        type="button"
+                        onClick={() => void loadMoreOrders()}
+                        disabled={ordersLoadingMore}
+                        className="mt-4 w-full rounded-full bg-emerald-50 px-4 py-2 text-sm font-semibold text-emerald-600 transition hover:bg-emerald-100 disabled:opacity-60"
+                      >
+                        {ordersLoadingMore ? "Yuklanmoqda..." : "Yana yuklash"}
+                      </button>
+                    ) : null}
                 </div>
               </section>
               ) : (
@@ -421,6 +525,9 @@ const App: React.FC = () => {
                 orders={orders}
                 ordersLoading={ordersLoading}
                 ordersError={ordersError}
+                hasMoreOrders={Boolean(ordersCursor)}
+                ordersLoadingMore={ordersLoadingMore}
+                onLoadMoreOrders={() => void loadMoreOrders()}
                 onOrderCreated={handleOrderCreated}
                 onRequireProfile={() => setActiveTab("profile")}
               />
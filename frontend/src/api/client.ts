@@ -1,5 +1,13 @@
 import axios from "axios";
-import type { AdminPhoneNumber, Category, Order, Product, User } from "../types";
+import type {
+  AdminPhoneNumber,
+  CatalogCategory,
+  Category,
+  Order,
+  OrderEvent,
+  Product,
+  User,
+} from "../types";
 
 const normalizedBackendUrl = __BACKEND_URL__.replace(/\/+$/, "");
 const normalizedPrefix = (__BACKEND_API_PREFIX__ || "").trim();
@@ -14,6 +22,31 @@ export const apiClient = axios.create({
   baseURL,
 });
 
+let sessionToken: string | null = null;
+
+export const setSessionToken = (token: string | null) => {
+  sessionToken = token;
+};
+
+apiClient.interceptors.request.use((config) => {
+  if (sessionToken) {
+    config.headers.set("Authorization", `Bearer ${sessionToken}`);
+  }
+  return config;
+});
+
+export interface TelegramSession {
+  token: string;
+  expires_at: string;
+  telegram_id: number;
+  is_admin: boolean;
+}
+
+export const createSession = async (initData: string) => {
+  const response = await apiClient.post<TelegramSession>("/auth/session", { init_data: initData });
+  return response.data;
+};
+
 const buildAdminHeaders = (
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
@@ -28,6 +61,88 @@ const buildAdminHeaders = (
   return headers;
 };
 
+type MediaKind = "products" | "categories";
+
+interface MediaUploadTicket {
+  key: string;
+  media_url: string;
+  exists: boolean;
+  upload_url: string | null;
+  method: string | null;
+  headers: Record<string, string>;
+}
+
+let directUploadsSupported = true;
+
+const sha256Hex = async (file: File) => {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, "0")).join("");
+};
+
+// Sends the image straight to object storage when the backend allows it and returns
+// its key. A null result means the file should go in the form data instead.
+const uploadImageDirect = async (
+  file: File,
+  kind: MediaKind,
+  headers: Record<string, string>,
+): Promise<string | null> => {
+  if (!directUploadsSupported || typeof crypto === "undefined" || !crypto.subtle) {
+    return null;
+  }
+
+  let ticket: MediaUploadTicket;
+  try {
+    const response = await apiClient.post<MediaUploadTicket>(
+      "/media/uploads",
+      {
+        kind,
+        filename: file.name,
+        content_type: file.type,
+        size: file.size,
+        sha256: await sha256Hex(file),
+      },
+      { headers: Object.keys(headers).length ? headers : undefined },
+    );
+    ticket = response.data;
+  } catch (error) {
+    if (axios.isAxiosError(error) && error.response?.status === 501) {
+      directUploadsSupported = false;
+    }
+    return null;
+  }
+
+  if (!ticket.exists && ticket.upload_url) {
+    try {
+      const upload = await fetch(ticket.upload_url, {
+        method: ticket.method ?? "PUT",
+        headers: ticket.headers,
+        body: file,
+      });
+      if (!upload.ok) {
+        return null;
+      }
+    } catch {
+      return null;
+    }
+  }
+  return ticket.key;
+};
+
+const appendImage = async (
+  formData: FormData,
+  image: File | null | undefined,
+  kind: MediaKind,
+  headers: Record<string, string>,
+) => {
+  if (!image) return;
+  const imageKey = await uploadImageDirect(image, kind, headers);
+  if (imageKey) {
+    formData.append("image_key", imageKey);
+  } else {
+    formData.append("image", image);
+  }
+};
+
 export interface UserPayload {
   telegram_id: number;
   name: string;
@@ -45,6 +160,11 @@ export const fetchUserByTelegramId = async (telegramId: number) => {
   return response.data;
 };
 
+export const fetchCatalog = async () => {
+  const response = await apiClient.get<CatalogCategory[]>("/catalog");
+  return response.data;
+};
+
 export const fetchCategories = async () => {
   const response = await apiClient.get("/categories");
   return response.data;
@@ -55,13 +175,11 @@ export const createCategory = async (
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
 ) => {
+  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const formData = new FormData();
   formData.append("name", payload.name);
-  if (payload.image) {
-    formData.append("image", payload.image);
-  }
+  await appendImage(formData, payload.image, "categories", headers);
 
-  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const response = await apiClient.post<Category>("/categories", formData, {
     headers: Object.keys(headers).length ? headers : undefined,
   });
@@ -86,6 +204,7 @@ export const createProduct = async (
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
 ) => {
+  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const formData = new FormData();
   formData.append("category_id", String(payload.category_id));
   formData.append("name", payload.name);
@@ -93,11 +212,8 @@ export const createProduct = async (
   if (payload.detail) {
     formData.append("detail", payload.detail);
   }
-  if (payload.image) {
-    formData.append("image", payload.image);
-  }
+  await appendImage(formData, payload.image, "products", headers);
 
-  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const response = await apiClient.post<Product>("/products", formData, {
     headers: Object.keys(headers).length ? headers : undefined,
   });
@@ -110,13 +226,11 @@ export const updateCategory = async (
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
 ) => {
+  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const formData = new FormData();
   formData.append("name", payload.name);
-  if (payload.image) {
-    formData.append("image", payload.image);
-  }
+  await appendImage(formData, payload.image, "categories", headers);
 
-  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const response = await apiClient.put<Category>(`/categories/${categoryId}`, formData, {
     headers: Object.keys(headers).length ? headers : undefined,
   });
@@ -146,6 +260,7 @@ export const updateProduct = async (
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
 ) => {
+  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const formData = new FormData();
   formData.append("category_id", String(payload.category_id));
   formData.append("name", payload.name);
@@ -153,11 +268,8 @@ export const updateProduct = async (
   if (payload.detail) {
     formData.append("detail", payload.detail);
   }
-  if (payload.image) {
-    formData.append("image", payload.image);
-  }
+  await appendImage(formData, payload.image, "products", headers);
 
-  const headers = buildAdminHeaders(adminTelegramId, adminPhoneNumber);
   const response = await apiClient.put<Product>(`/products/${productId}`, formData, {
     headers: Object.keys(headers).length ? headers : undefined,
   });
@@ -175,12 +287,17 @@ export const deleteProduct = async (
   });
 };
 
-export const createOrder = async (payload: {
-  user_id: number;
-  items: Array<{ product_id: number; quantity: number }>;
-  comment?: string | null;
-}) => {
-  const response = await apiClient.post<Order>("/orders", payload);
+export const createOrder = async (
+  payload: {
+    user_id: number;
+    items: Array<{ product_id: number; quantity: number }>;
+    comment?: string | null;
+  },
+  idempotencyKey?: string,
+) => {
+  const response = await apiClient.post<Order>("/orders", payload, {
+    headers: idempotencyKey ? { "Idempotency-Key": idempotencyKey } : undefined,
+  });
   return response.data;
 };
 
@@ -189,17 +306,108 @@ export const fetchUserOrders = async (userId: number) => {
   return response.data;
 };
 
-export const fetchAllOrders = async (
+export interface OrderListParams {
+  status?: string;
+  user_id?: number;
+  created_from?: string;
+  created_to?: string;
+  cursor?: string;
+  limit?: number;
+}
+
+export const fetchOrdersPage = async (
+  params: OrderListParams,
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
 ) => {
   const headers = buildAdminHeaders(adminTelegramId ?? undefined, adminPhoneNumber ?? undefined);
   const response = await apiClient.get<Order[]>("/orders", {
+    params,
     headers: Object.keys(headers).length ? headers : undefined,
   });
-  return response.data;
+  const nextCursor = response.headers["x-next-cursor"] as string | undefined;
+  return { orders: response.data, nextCursor: nextCursor ?? null };
+};
+
+const ORDER_EVENTS_RETRY_DELAY_MS = 5000;
+
+// 401/403 are not retried: the stream stops and onDenied gets the status, so the
+// caller can renew the session or show the error.
+const streamOrderEvents = (
+  path: string,
+  onEvent: (event: OrderEvent) => void,
+  headers?: Record<string, string>,
+  onDenied?: (status: number) => void,
+) => {
+  const controller = new AbortController();
+
+  const run = async () => {
+    while (!controller.signal.aborted) {
+      try {
+        const requestHeaders: Record<string, string> = { ...headers };
+        if (sessionToken) {
+          requestHeaders.Authorization = `Bearer ${sessionToken}`;
+        }
+        const response = await fetch(`${baseURL}${path}`, {
+          headers: requestHeaders,
+          signal: controller.signal,
+        });
+        if (response.status === 401 || response.status === 403) {
+          onDenied?.(response.status);
+          return;
+        }
+        if (!response.ok || !response.body) {
+          throw new Error(`Order event stream failed with status ${response.status}`);
+        }
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = "";
+        for (;;) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += value;
+          let boundary = buffer.indexOf("\n\n");
+          while (boundary !== -1) {
+            const data = buffer
+              .slice(0, boundary)
+              .split("\n")
+              .filter((line) => line.startsWith("data:"))
+              .map((line) => line.slice(5).trim())
+              .join("\n");
+            buffer = buffer.slice(boundary + 2);
+            if (data) {
+              onEvent(JSON.parse(data) as OrderEvent);
+            }
+            boundary = buffer.indexOf("\n\n");
+          }
+        }
+      } catch (err) {
+        if (controller.signal.aborted) return;
+        console.error(err);
+      }
+      await new Promise((resolve) => setTimeout(resolve, ORDER_EVENTS_RETRY_DELAY_MS));
+    }
+  };
+
+  void run();
+  return () => controller.abort();
+};
+
+export const subscribeToAllOrderEvents = (
+  onEvent: (event: OrderEvent) => void,
+  adminTelegramId?: number | null,
+  adminPhoneNumber?: string | null,
+  onDenied?: (status: number) => void,
+) => {
+  const headers = buildAdminHeaders(adminTelegramId ?? undefined, adminPhoneNumber ?? undefined);
+  return streamOrderEvents("/orders/events", onEvent, headers, onDenied);
 };
 
+export const subscribeToUserOrderEvents = (
+  userId: number,
+  onEvent: (event: OrderEvent) => void,
+  onDenied?: (status: number) => void,
+) => streamOrderEvents(`/orders/user/${userId}/events`, onEvent, undefined, onDenied);
+
 export const fetchAdminPhoneNumbers = async (
   adminTelegramId?: number | null,
   adminPhoneNumber?: string | null,
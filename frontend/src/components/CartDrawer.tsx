@@ -2,6 +2,7 @@ import { useEffect, useMemo, useState } from "react";
 import { createOrder } from "../api/client";
 import { useCart } from "../context/CartContext";
 import type { Order, User } from "../types";
+import { resolveImageVariant } from "../utils/media";
 
 interface Props {
   user: User;
@@ -27,13 +28,16 @@ export const CartDrawer: React.FC<Props> = ({ user, open, onClose, onOrderCreate
     [state.items],
   );
 
+  // A fresh key per cart contents: retries of the same checkout reuse it, edits start a new one.
+  const idempotencyKey = useMemo(() => crypto.randomUUID(), [itemsForPayload]);
+
   const handleSubmit = async () => {
     if (!state.items.length) return;
 
     setSubmitting(true);
     setError(null);
     try {
-      const order = await createOrder({ user_id: user.id, items: itemsForPayload });
+      const order = await createOrder({ user_id: user.id, items: itemsForPayload }, idempotencyKey);
       setSuccess(true);
       clearCart();
       if (order) {
@@ -95,7 +99,10 @@ export const CartDrawer: React.FC<Props> = ({ user, open, onClose, onOrderCreate
                 >
                   {item.product.image_path ? (
                     <img
-                      src={item.product.image_path}
+                      src={
+                        resolveImageVariant(item.product.image_path, item.product.image_variants, "thumb") ??
+                        undefined
+                      }
                       alt={item.product.name}
                       className="h-16 w-16 rounded-2xl object-cover"
                     />
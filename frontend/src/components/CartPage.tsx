@@ -2,7 +2,7 @@ import { useEffect, useMemo, useState } from "react";
 import { createOrder } from "../api/client";
 import { useCart } from "../context/CartContext";
 import type { Order, User } from "../types";
-import { resolveMediaUrl } from "../utils/media";
+import { resolveImageVariant } from "../utils/media";
 
 interface CartPageProps {
   user: User | null;
@@ -12,6 +12,9 @@ interface CartPageProps {
   orders: Order[];
   ordersLoading: boolean;
   ordersError: string | null;
+  hasMoreOrders?: boolean;
+  ordersLoadingMore?: boolean;
+  onLoadMoreOrders?: () => void;
   onOrderCreated?: (order: Order) => void;
   onRequireProfile: () => void;
 }
@@ -24,6 +27,9 @@ export const CartPage: React.FC<CartPageProps> = ({
   orders,
   ordersLoading,
   ordersError,
+  hasMoreOrders = false,
+  ordersLoadingMore = false,
+  onLoadMoreOrders,
   onOrderCreated,
   onRequireProfile,
 }) => {
@@ -49,6 +55,9 @@ export const CartPage: React.FC<CartPageProps> = ({
     [state.items],
   );
 
+  // A fresh key per cart contents: retries of the same checkout reuse it, edits start a new one.
+  const idempotencyKey = useMemo(() => crypto.randomUUID(), [itemsForPayload]);
+
   const handleSubmit = async () => {
     if (!state.items.length) {
       return;
@@ -62,7 +71,7 @@ export const CartPage: React.FC<CartPageProps> = ({
     setSubmitting(true);
     setError(null);
     try {
-      const order = await createOrder({ user_id: user.id, items: itemsForPayload });
+      const order = await createOrder({ user_id: user.id, items: itemsForPayload }, idempotencyKey);
       setSuccess(true);
       clearCart();
       onViewChange("history");
@@ -85,7 +94,11 @@ export const CartPage: React.FC<CartPageProps> = ({
     return (
       <div className="space-y-4">
         {state.items.map((item) => {
-          const productImage = resolveMediaUrl(item.product.image_path);
+          const productImage = resolveImageVariant(
+            item.product.image_path,
+            item.product.image_variants,
+            "thumb",
+          );
           return (
             <div
             key={item.product.id}
@@ -289,6 +302,16 @@ export const CartPage: React.FC<CartPageProps> = ({
 
       <div className="mt-6 rounded-3xl bg-gray-50/70 p-6">
         {activeView === "cart" ? renderCartItems() : renderHistory()}
+        {activeView === "history" && !ordersLoading && !ordersError && hasMoreOrders && onLoadMoreOrders ? (
+          <button
+            type="button"
+            onClick={onLoadMoreOrders}
+            disabled={ordersLoadingMore}
+            className="mt-4 w-full rounded-full bg-emerald-50 px-4 py-2 text-sm font-semibold text-emerald-600 transition hover:bg-emerald-100 disabled:opacity-60"
+          >
+            {ordersLoadingMore ? "Yuklanmoqda..." : "Yana yuklash"}
+          </button>
+        ) : null}
       </div>
     </section>
   );
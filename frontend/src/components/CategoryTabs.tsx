@@ -1,6 +1,6 @@
 import clsx from "clsx";
 import type { Category } from "../types";
-import { resolveMediaUrl } from "../utils/media";
+import { resolveImageVariant } from "../utils/media";
 
 interface Props {
   categories: Category[];
@@ -34,7 +34,7 @@ export const CategoryTabs: React.FC<Props> = ({ categories, activeId, onSelect }
         Hammasi
       </button>
       {categories.map((category) => {
-        const imageUrl = resolveMediaUrl(category.image_path);
+        const imageUrl = resolveImageVariant(category.image_path, category.image_variants, "thumb");
         return (
           <button
             key={category.id}
@@ -1,6 +1,6 @@
 import { useCart } from "../context/CartContext";
 import type { Product } from "../types";
-import { resolveMediaUrl } from "../utils/media";
+import { buildImageSrcSet, resolveImageVariant } from "../utils/media";
 
 interface Props {
   product: Product;
@@ -11,7 +11,8 @@ export const ProductCard: React.FC<Props> = ({ product }) => {
 
   const cartItem = state.items.find((item) => item.product.id === product.id);
   const quantity = cartItem?.quantity ?? 0;
-  const imageUrl = resolveMediaUrl(product.image_path);
+  const imageUrl = resolveImageVariant(product.image_path, product.image_variants, "card");
+  const imageSrcSet = buildImageSrcSet(product.image_variants);
 
   const handleIncrease = () => {
     addToCart(product);
@@ -32,7 +33,10 @@ export const ProductCard: React.FC<Props> = ({ product }) => {
         {imageUrl ? (
           <img
             src={imageUrl}
+            srcSet={imageSrcSet}
+            sizes="(min-width: 768px) 33vw, 50vw"
             alt={product.name}
+            loading="lazy"
             className="h-40 w-full object-cover transition duration-500 group-hover:scale-105"
           />
         ) : (
@@ -9,10 +9,15 @@ export interface User {
   is_admin: boolean;
 }
 
+export type ImageVariantName = "thumb" | "card" | "detail";
+
+export type ImageVariants = Partial<Record<ImageVariantName, string>>;
+
 export interface Category {
   id: number;
   name: string;
   image_path?: string | null;
+  image_variants?: ImageVariants | null;
 }
 
 export interface Product {
@@ -21,9 +26,14 @@ export interface Product {
   name: string;
   price: number;
   image_path?: string | null;
+  image_variants?: ImageVariants | null;
   detail?: string | null;
 }
 
+export interface CatalogCategory extends Category {
+  products: Product[];
+}
+
 export interface CartItem {
   product: Product;
   quantity: number;
@@ -54,6 +64,15 @@ export interface Order {
   }>;
 }
 
+export interface OrderEvent {
+  type: "order_created" | "order_status_changed";
+  order_id: number;
+  user_id: number;
+  status: string;
+  total_price: number;
+  updated_at: string | null;
+}
+
 export interface AdminPhoneNumber {
   id: number | null;
   phone_number: string;
@@ -1,3 +1,5 @@
+import type { ImageVariantName, ImageVariants } from "../types";
+
 const rawLimit = Number.parseFloat(import.meta.env.VITE_MAX_UPLOAD_SIZE_MB ?? "10");
 export const MAX_UPLOAD_SIZE_MB = Number.isFinite(rawLimit) && rawLimit > 0 ? rawLimit : 10;
 export const MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024;
@@ -24,3 +26,14 @@ export const resolveMediaUrl = (path?: string | null): string | null => {
   }
   return `${normalizedBase}${normalizedPath}`;
 };
+
+export const resolveImageVariant = (
+  path: string | null | undefined,
+  variants: ImageVariants | null | undefined,
+  variant: ImageVariantName,
+): string | null => resolveMediaUrl(variants?.[variant] ?? path);
+
+export const buildImageSrcSet = (variants?: ImageVariants | null): string | undefined => {
+  if (!variants?.card || !variants.detail) return undefined;
+  return `${resolveMediaUrl(variants.card)} 480w, ${resolveMediaUrl(variants.detail)} 1080w`;
+};